@@ -0,0 +1,93 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from app_paths import data_path
+
+
+class AICache:
+    """
+    AI 檔名建議的磁碟快取 (SQLite)。
+    key = 內容 SHA-256 + 模型 + prompt 版本 + 副檔名，因此同內容換了檔名或跨工作階段都能命中。
+    超過 max_age_days 未使用、或總數超過 max_entries 時，依最後使用時間淘汰。
+    """
+    HASH_CHUNK = 1024 * 1024
+    # 每寫入這麼多筆才檢查一次淘汰條件
+    EVICT_EVERY = 200
+
+    def __init__(self, path=None, max_entries=50000, max_age_days=180):
+        self.path = path or data_path("ai_cache.sqlite3")
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS suggestions ("
+                " key TEXT PRIMARY KEY,"
+                " name TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON suggestions(last_used)")
+        self.evict()
+
+    @staticmethod
+    def content_hash(file_path):
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(AICache.HASH_CHUNK), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def make_key(digest, model, prompt_version, ext):
+        return f"{digest}:{model}:v{prompt_version}:{ext}"
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT name, last_used FROM suggestions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            name, last_used = row
+            if now - last_used > self.max_age:
+                self._conn.execute("DELETE FROM suggestions WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE suggestions SET last_used = ? WHERE key = ?", (now, key))
+            return name
+
+    def put(self, key, name):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO suggestions (key, name, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, name, now, now)
+            )
+            self._puts += 1
+            evict = self._puts % self.EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM suggestions WHERE last_used < ?", (time.time() - self.max_age,))
+            count = self._conn.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM suggestions WHERE key IN ("
+                    " SELECT key FROM suggestions ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM suggestions")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
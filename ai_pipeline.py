@@ -0,0 +1,197 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from ai_service import AIService, IMAGE_EXTENSIONS, DOC_EXTENSIONS
+from doc_parser import DocParser
+import tracing
+
+
+def _worker_config():
+    """子行程看不到主行程執行期修改的類別屬性，需明確傳入"""
+    return (
+        AIService.MODEL_NAME,
+        AIService.PROMPT_VERSION,
+        AIService.IMAGE_MAX_EDGE,
+        AIService.CACHE_ENABLED,
+        DocParser.MAX_CHARS,
+    )
+
+
+def _init_worker(config):
+    (AIService.MODEL_NAME, AIService.PROMPT_VERSION, AIService.IMAGE_MAX_EDGE,
+     AIService.CACHE_ENABLED, DocParser.MAX_CHARS) = config
+    tracing.reset() # fork 出的子行程會帶著主行程已有的紀錄
+
+
+def _prepare_in_worker(file_path):
+    """回傳 ((job, msg), 追蹤紀錄)；追蹤紀錄由主行程合併"""
+    return AIService.prepare(file_path), tracing.drain()
+
+
+class AIPipeline:
+    """
+    分段式 AI 命名管線：
+      1. 擷取/編碼：圖片與文件送進行程池 (CPU 密集)，其餘檔案在驅動執行緒直接處理
+      2. 準備好的請求放入有界佇列；佇列滿時暫停送出新的擷取工作，限制記憶體用量
+      3. request_workers 個執行緒從佇列取出並送出 API 請求
+    夠小的文字檔 (job['excerpt']) 每 batch_size 個合併成一個多檔請求，回應中缺漏的檔案再單獨請求。
+    行程池在多次批次之間共用。
+    """
+    HEAVY_EXTENSIONS = IMAGE_EXTENSIONS | DOC_EXTENSIONS
+
+    _process_pool = None
+    _pool_key = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self, request_workers=None, prepare_workers=None, queue_size=None, batch_size=None):
+        self.request_workers = request_workers or AIService.MAX_CONCURRENCY
+        self.batch_size = batch_size or AIService.BATCH_SIZE
+        self.prepare_workers = prepare_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.queue_size = queue_size or self.request_workers * 2
+
+    @classmethod
+    def get_process_pool(cls, workers):
+        key = (_worker_config(), workers)
+        with cls._pool_lock:
+            if cls._process_pool is None or cls._pool_key != key:
+                if cls._process_pool is not None:
+                    cls._process_pool.shutdown(wait=False)
+                cls._process_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(key[0],)
+                )
+                cls._pool_key = key
+            return cls._process_pool
+
+    def run(self, jobs, on_result=None, should_cancel=None):
+        """
+        jobs: 可迭代的 (uid, file_path)
+        回傳: (成功數, [(uid, file_path, 錯誤訊息), ...])
+        """
+        ready = queue.Queue(maxsize=self.queue_size)
+        lock = threading.Lock()
+        succeeded = [0]
+        failures = []
+
+        def report(uid, file_path, new_name, msg):
+            with lock:
+                if new_name:
+                    succeeded[0] += 1
+                else:
+                    failures.append((uid, file_path, msg))
+            if on_result:
+                on_result(uid, new_name, msg)
+
+        def request_batch(items):
+            results = AIService.request_names([job for _, _, job in items])
+            for (uid, file_path, job), (new_name, msg) in zip(items, results):
+                if new_name is None and not (should_cancel and should_cancel()):
+                    tracing.count("ai.batch_fallback")
+                    new_name, msg = AIService.request_name(job)
+                report(uid, file_path, new_name, msg)
+
+        def request_loop():
+            while True:
+                item = ready.get()
+                if item is None:
+                    return
+                # 已取消時丟棄尚未送出的請求
+                if should_cancel and should_cancel():
+                    continue
+                if isinstance(item, list): # 多檔請求
+                    try:
+                        request_batch(item)
+                    except Exception as e:
+                        for uid, file_path, _ in item:
+                            report(uid, file_path, None, f"API 請求錯誤: {e}")
+                    continue
+                uid, file_path, job = item
+                try:
+                    new_name, msg = AIService.request_name(job)
+                except Exception as e:
+                    new_name, msg = None, f"API 請求錯誤: {e}"
+                report(uid, file_path, new_name, msg)
+
+        threads = [
+            threading.Thread(target=request_loop, name=f"ai-request-{i}", daemon=True)
+            for i in range(self.request_workers)
+        ]
+        for t in threads:
+            t.start()
+
+        try:
+            self._drive(iter(jobs), ready, report, should_cancel)
+        finally:
+            for _ in threads:
+                ready.put(None)
+            for t in threads:
+                t.join()
+
+        return succeeded[0], failures
+
+    def _drive(self, jobs, ready, report, should_cancel):
+        pending = {}
+        pool = None
+        exhausted = False
+        inflight_limit = self.prepare_workers * 2
+        batch = []
+        batch_chars = 0
+
+        def flush():
+            nonlocal batch, batch_chars
+            if batch:
+                ready.put(batch)
+                batch, batch_chars = [], 0
+
+        def forward(uid, file_path, job, msg):
+            nonlocal batch_chars
+            if job is None:
+                report(uid, file_path, None, msg)
+            elif job['name']:
+                report(uid, file_path, job['name'], msg)
+            elif job.get('excerpt') is not None and self.batch_size > 1:
+                if batch and batch_chars + len(job['excerpt']) > AIService.BATCH_MAX_CHARS:
+                    flush()
+                batch.append((uid, file_path, job))
+                batch_chars += len(job['excerpt'])
+                if len(batch) >= self.batch_size:
+                    flush()
+            else:
+                ready.put((uid, file_path, job)) # 佇列滿時在此阻塞，形成背壓
+
+        while True:
+            while not exhausted and len(pending) < inflight_limit:
+                if should_cancel and should_cancel():
+                    exhausted = True
+                    break
+                nxt = next(jobs, None)
+                if nxt is None:
+                    exhausted = True
+                    break
+                uid, file_path = nxt
+                ext = os.path.splitext(file_path)[1].lower()
+                if ext in self.HEAVY_EXTENSIONS:
+                    pool = pool or self.get_process_pool(self.prepare_workers)
+                    pending[pool.submit(_prepare_in_worker, file_path)] = (uid, file_path)
+                else:
+                    job, msg = AIService.prepare(file_path)
+                    forward(uid, file_path, job, msg)
+
+            if not pending:
+                if exhausted:
+                    flush()
+                    return
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                uid, file_path = pending.pop(fut)
+                try:
+                    (job, msg), trace = fut.result()
+                    tracing.merge(trace)
+                except Exception as e:
+                    job, msg = None, f"檔案處理失敗: {e}"
+                forward(uid, file_path, job, msg)
@@ -1,7 +1,13 @@
+import json
 import os
-import base64
-from openai import OpenAI, BadRequestError
-from doc_parser import DocParser
+import sqlite3
+import sys
+import threading
+# openai (約 0.5 秒) 與文件解析套件在第一次使用時才載入，只用 RegEx 的工作階段不需付出這些成本
+from ai_cache import AICache
+from endpoint_caps import EndpointCapabilities
+from image_prep import prepare_image
+import tracing
 
 MAX_SIZE_MB = 2
 
@@ -29,19 +35,166 @@ class AIService:
     # 模型名稱
     MODEL_NAME = "gpt-5-nano"
 
+    # 圖片上傳前縮至此長邊 (px)；base64 後的大小上限為 MAX_SIZE_MB
+    IMAGE_MAX_EDGE = 1568
+
+    # 批次模式同時進行的請求數，與 429 時 SDK 自動退避重試的次數
+    MAX_CONCURRENCY = 8
+    MAX_RETRIES = 5
+
+    # 修改 prompt 或回應處理方式時請遞增，讓舊的快取結果失效
+    PROMPT_VERSION = 3
+    CACHE_ENABLED = True
+    _cache = None
+    _cache_lock = threading.Lock()
+
+    # 回應長度上限；能力探測請求只需極少量 token
+    SAFE_TOKEN_LIMIT = 1000
+    PROBE_TOKEN_LIMIT = 16
+    REQUEST_TIMEOUT = 120
+
+    # 多檔請求：內容不超過 BATCH_EXCERPT_CHARS 的文字檔最多 BATCH_SIZE 個合併成一個請求 (1 = 停用)
+    BATCH_SIZE = 8
+    BATCH_EXCERPT_CHARS = 1500
+    BATCH_MAX_CHARS = 12000
+    BATCH_TOKENS_PER_FILE = 64
+
+    SYSTEM_PROMPT = (
+        "You are a file renaming assistant. "
+        "Analyze the user's file content and suggest a short, descriptive, English filename (snake_case). "
+        "You must KEEP the original extension given by the user. "
+        "Output ONLY the filename. No markdown, no explanation."
+    )
+    BATCH_SYSTEM_PROMPT = (
+        "You are a file renaming assistant. "
+        "The user sends several files, each starting with a header line '=== FILE <id> (<extension>) ==='. "
+        "For every file, analyze its content and suggest a short, descriptive, English filename (snake_case) "
+        "that KEEPS its original extension. "
+        'Output ONLY a JSON array with one entry per file, e.g. [{"id": 1, "name": "meeting_notes.txt"}]. '
+        "No markdown, no explanation."
+    )
+
+    _caps_store = None
+    _caps_lock = threading.RLock()
+
     @staticmethod
     def is_configured():
         return AIService._client is not None
 
     @staticmethod
     def configure(api_key, base_url):
+        # 相同設定沿用既有 client，保留連線池中已建立的連線
+        if AIService._client is not None and (api_key, base_url) == (AIService._api_key, AIService._base_url):
+            return
+        from openai import OpenAI, DefaultHttpxClient, Timeout, DEFAULT_CONNECTION_LIMITS
         AIService._api_key = api_key
         AIService._base_url = base_url
+
+        # 連線池依批次並行數調整；Limits 型別沿用 SDK 內建的 (不同版本的 SDK 底層 HTTP 套件不同)
+        limits = type(DEFAULT_CONNECTION_LIMITS)(
+            max_connections=AIService.MAX_CONCURRENCY * 2,
+            max_keepalive_connections=AIService.MAX_CONCURRENCY,
+            keepalive_expiry=DEFAULT_CONNECTION_LIMITS.keepalive_expiry
+        )
         AIService._client = OpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            max_retries=AIService.MAX_RETRIES,
+            http_client=DefaultHttpxClient(
+                limits=limits,
+                timeout=Timeout(AIService.REQUEST_TIMEOUT, connect=10.0)
+            )
         )
 
+    @staticmethod
+    def _get_caps_store():
+        with AIService._caps_lock:
+            if AIService._caps_store is None:
+                AIService._caps_store = EndpointCapabilities()
+            return AIService._caps_store
+
+    @staticmethod
+    def _default_capabilities():
+        is_official_api = "api.openai.com" in AIService._base_url
+        return {
+            "token_param": "max_completion_tokens" if is_official_api else "max_tokens",
+            "reasoning_effort": True
+        }
+
+    @staticmethod
+    def _adapt_capabilities(caps, error):
+        """依 BadRequest 的錯誤內容調整參數能力；與參數無關的錯誤回傳 None"""
+        error_msg = str(error).lower()
+        body = str(error.body).lower() if getattr(error, "body", None) else ""
+        adapted = dict(caps)
+
+        if caps["reasoning_effort"] and ("reasoning_effort" in error_msg or "reasoning_effort" in body):
+            print("API 不支援 reasoning_effort，之後的請求將不再傳送", file=sys.stderr)
+            adapted["reasoning_effort"] = False
+
+        if "max_tokens" in error_msg or "max_completion_tokens" in error_msg:
+            print("API Token 參數不相容，切換參數名稱", file=sys.stderr)
+            adapted["token_param"] = "max_tokens" if caps["token_param"] == "max_completion_tokens" else "max_completion_tokens"
+
+        return adapted if adapted != caps else None
+
+    @staticmethod
+    def _shape_request(request_kwargs, caps, token_limit):
+        if caps["reasoning_effort"]:
+            request_kwargs["reasoning_effort"] = "low"
+        request_kwargs[caps["token_param"]] = token_limit
+        return request_kwargs
+
+    @staticmethod
+    def probe_capabilities():
+        """
+        以極小的請求探測目前 endpoint + 模型接受的參數並寫入快取。
+        與參數無關的錯誤 (金鑰、網路等) 會直接拋出，不寫入快取。
+        """
+        from openai import BadRequestError
+        caps = AIService._default_capabilities()
+        # 最多需要調整兩個參數，因此三次嘗試即可收斂
+        for _ in range(3):
+            request_kwargs = AIService._shape_request({
+                "model": AIService.MODEL_NAME,
+                "messages": [{"role": "user", "content": "ping"}],
+            }, caps, AIService.PROBE_TOKEN_LIMIT)
+            try:
+                AIService._client.chat.completions.create(**request_kwargs)
+            except BadRequestError as e:
+                adapted = AIService._adapt_capabilities(caps, e)
+                if adapted is None:
+                    raise
+                caps = adapted
+                continue
+            AIService._get_caps_store().set(AIService._base_url, AIService.MODEL_NAME, caps)
+            return caps
+        raise RuntimeError("無法判斷 API 接受的參數格式")
+
+    @staticmethod
+    def get_capabilities():
+        """記憶體/磁碟快取 → 沒有才探測；以鎖確保批次中只探測一次"""
+        with AIService._caps_lock:
+            caps = AIService._get_caps_store().get(AIService._base_url, AIService.MODEL_NAME)
+            if caps is None:
+                caps = AIService.probe_capabilities()
+            return caps
+
+    @staticmethod
+    def get_cache():
+        """延遲建立 AI 快取；無法建立時停用快取並回傳 None"""
+        if not AIService.CACHE_ENABLED:
+            return None
+        with AIService._cache_lock:
+            if AIService._cache is None:
+                try:
+                    AIService._cache = AICache()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Warning: 無法開啟 AI 快取 ({e})", file=sys.stderr)
+                    AIService.CACHE_ENABLED = False
+                    return None
+            return AIService._cache
+
     @staticmethod
     def validate_file(file_path):
         _, ext = os.path.splitext(file_path)
@@ -60,8 +213,12 @@ class AIService:
 
     @staticmethod
     def _encode_image(image_path):
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        """縮圖並重新編碼，回傳 (mime, base64)"""
+        return prepare_image(
+            image_path,
+            max_edge=AIService.IMAGE_MAX_EDGE,
+            max_bytes=int(MAX_SIZE_MB * 1024 * 1024)
+        )
 
     @staticmethod
     def _read_text_head(file_path, chars=3000):
@@ -72,120 +229,247 @@ class AIService:
             return None
 
     @staticmethod
-    def analyze_and_rename(file_path):
-        if not AIService._client:
-            return None, "尚未設定 API Key"
+    def build_user_content(file_path, ext):
+        """讀取 / 解析 / 編碼檔案內容 (CPU 密集，可在子行程執行)"""
+        base_name = os.path.basename(file_path)
+        user_content = []
+
+        if ext in IMAGE_EXTENSIONS:
+            mime, base64_image = AIService._encode_image(file_path)
+            user_content.append({"type": "text", "text": "What is in this image? Rename it."})
+            user_content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:{mime};base64,{base64_image}"}
+            })
+
+        elif ext in TEXT_EXTENSIONS:
+            content = AIService._read_text_head(file_path)
+            if content:
+                user_content.append({"type": "text", "text": f"File content:\n{content}\n\nSuggest a filename."})
+            else:
+                user_content.append({"type": "text", "text": f"Original filename: '{base_name}'. Content is empty or unreadable. Suggest a clean filename."})
+
+        elif ext in DOC_EXTENSIONS:
+            from doc_parser import DocParser
+            content = DocParser.extract_content(file_path)
+            if content:
+                 user_content.append({"type": "text", "text": f"Document content excerpt:\n{content}\n\nSuggest a filename based on this content."})
+            else:
+                 user_content.append({"type": "text", "text": f"Original filename: '{base_name}'. Could not parse document text. Suggest a clean filename."})
+
+        else:
+            user_content.append({"type": "text", "text": f"Original filename: '{base_name}'. Clean up and standardize this filename."})
 
-        valid, msg = AIService.validate_file(file_path)
+        return user_content
+
+    @staticmethod
+    def prepare(file_path):
+        """
+        請求前的準備階段：驗證、查快取、擷取與編碼內容。
+        回傳: (job, msg)；job 為 dict (快取命中時 job['name'] 已有結果)，失敗時為 None
+        夠小的文字檔只讀取 job['excerpt']，交由 AIPipeline 併入多檔請求 (user_content 需要時才建立)
+        """
+        with tracing.span("ai.validate"):
+            valid, msg = AIService.validate_file(file_path)
         if not valid:
             return None, msg
 
-        base_name = os.path.basename(file_path)
-        _, ext = os.path.splitext(base_name)
+        _, ext = os.path.splitext(file_path)
         ext = ext.lower()
+        job = {'file_path': file_path, 'ext': ext, 'cache_key': None, 'name': None, 'user_content': None, 'excerpt': None}
 
+        # 相同內容 (即使檔名不同) 分析過就直接回傳，不讀檔上傳也不需 API
+        cache = AIService.get_cache()
+        if cache:
+            try:
+                with tracing.span("ai.cache"):
+                    digest = AICache.content_hash(file_path)
+                    job['cache_key'] = AICache.make_key(digest, AIService.MODEL_NAME, AIService.PROMPT_VERSION, ext)
+                    cached_name = cache.get(job['cache_key'])
+                if cached_name:
+                    tracing.count("ai.cache_hit")
+                    job['name'] = cached_name
+                    return job, "AI 分析完成 (快取)"
+            except (OSError, sqlite3.Error) as e:
+                print(f"AI 快取讀取失敗 {file_path}: {e}", file=sys.stderr)
+                job['cache_key'] = None
+
+        if ext in TEXT_EXTENSIONS and AIService.BATCH_SIZE > 1:
+            with tracing.span("ai.extract", ext=ext):
+                text = AIService._read_text_head(file_path, AIService.BATCH_EXCERPT_CHARS + 1)
+            if text and text.strip() and len(text) <= AIService.BATCH_EXCERPT_CHARS:
+                job['excerpt'] = text
+                return job, ""
+
+        # 圖片的成本在縮圖與重新編碼，其他格式在讀取與解析
+        stage = "ai.encode" if ext in IMAGE_EXTENSIONS else "ai.extract"
         try:
-            messages = []
-            user_content = []
-            
-            system_prompt = (
-                "You are a file renaming assistant. "
-                "Analyze the user's file content and suggest a short, descriptive, English filename (snake_case). "
-                f"You must KEEP the original extension '{ext}'. "
-                "Output ONLY the filename. No markdown, no explanation."
-            )
+            with tracing.span(stage, ext=ext):
+                job['user_content'] = AIService.build_user_content(file_path, ext)
+        except Exception as e:
+            return None, f"檔案處理失敗: {e}"
 
-            if ext in IMAGE_EXTENSIONS:
-                base64_image = AIService._encode_image(file_path)
-                user_content.append({"type": "text", "text": "What is in this image? Rename it."})
-                user_content.append({
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
-                })
-            
-            elif ext in TEXT_EXTENSIONS:
-                content = AIService._read_text_head(file_path)
-                if content:
-                    user_content.append({"type": "text", "text": f"File content:\n{content}\n\nSuggest a filename."})
-                else:
-                    user_content.append({"type": "text", "text": f"Original filename: '{base_name}'. Content is empty or unreadable. Suggest a clean filename."})
-
-            elif ext in DOC_EXTENSIONS:
-                content = DocParser.extract_content(file_path)
-                if content:
-                     user_content.append({"type": "text", "text": f"Document content excerpt:\n{content}\n\nSuggest a filename based on this content."})
-                else:
-                     user_content.append({"type": "text", "text": f"Original filename: '{base_name}'. Could not parse document text. Suggest a clean filename."})
+        return job, ""
 
-            else:
-                user_content.append({"type": "text", "text": f"Original filename: '{base_name}'. Clean up and standardize this filename."})
-
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content}
-            ]
-            
-            is_official_api = "api.openai.com" in AIService._base_url
-            
-            SAFE_TOKEN_LIMIT = 1000 
+    @staticmethod
+    def analyze_and_rename(file_path):
+        job, msg = AIService.prepare(file_path)
+        if not job:
+            return None, msg
+        if job['name']:
+            return job['name'], msg
+        return AIService.request_name(job)
 
-            request_kwargs = {
+    @staticmethod
+    def _complete(messages, token_limit):
+        """送出請求並回傳回應文字；參數格式不被接受時更新能力快取後重試一次"""
+        from openai import BadRequestError
+        caps = AIService.get_capabilities()
+
+        # --- 發送請求 ---
+        def send_request(caps):
+            kwargs = AIService._shape_request({
                 "model": AIService.MODEL_NAME,
                 "messages": messages,
-            }
+            }, caps, token_limit)
+            # 請求內容經 tracing.redact 處理 (圖片只記錄長度)，只在 Chrome trace 格式保留
+            with tracing.span("ai.request", model=kwargs["model"]) as sp:
+                sp.set(request=kwargs)
+                return AIService._client.chat.completions.create(**kwargs)
 
-            request_kwargs["reasoning_effort"] = "low"
+        try:
+            response = send_request(caps)
 
-            if is_official_api:
-                request_kwargs["max_completion_tokens"] = SAFE_TOKEN_LIMIT
-            else:
-                request_kwargs["max_tokens"] = SAFE_TOKEN_LIMIT
+        except BadRequestError as e:
+            # 快取的能力已過時 (例如代理更換了後端)：更新快取後重試一次
+            adapted = AIService._adapt_capabilities(caps, e)
+            if adapted is None:
+                raise
+            tracing.count("ai.caps_adapted")
+            AIService._get_caps_store().set(AIService._base_url, AIService.MODEL_NAME, adapted)
+            response = send_request(adapted)
 
-            # --- 發送請求與自動修復邏輯 ---
-            def send_request(kwargs):
-                print("[Debug] 發送請求:", kwargs)
-                return AIService._client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content or ""
 
+    @staticmethod
+    def _clean_name(name, ext):
+        """去除 markdown 符號並補上副檔名；不像檔名 (空白、含路徑) 時回傳 None"""
+        name = name.replace("`", "").strip().strip("\"'").strip()
+        if not name or "/" in name or "\\" in name or name in (".", ".."):
+            return None
+        if not name.lower().endswith(ext):
+            name += ext
+        return name
+
+    @staticmethod
+    def _store(job, name):
+        if job['cache_key']:
             try:
-                response = send_request(request_kwargs)
+                AIService.get_cache().put(job['cache_key'], name)
+            except sqlite3.Error as e:
+                print(f"AI 快取寫入失敗: {e}", file=sys.stderr)
 
-            except BadRequestError as e:
-                error_msg = str(e).lower()
-                retry_needed = False
-                
-                if "reasoning_effort" in error_msg or (e.body and "reasoning_effort" in str(e.body)):
-                    print("API 不支援 reasoning_effort，移除後重試...")
-                    if "reasoning_effort" in request_kwargs:
-                        del request_kwargs["reasoning_effort"]
-                        retry_needed = True
-
-                if "max_tokens" in error_msg or "max_completion_tokens" in error_msg:
-                    print("API Token 參數不相容，切換參數名稱後重試...")
-
-                    if "max_tokens" in request_kwargs:
-                        del request_kwargs["max_tokens"]
-                        request_kwargs["max_completion_tokens"] = SAFE_TOKEN_LIMIT
-                    elif "max_completion_tokens" in request_kwargs:
-                        del request_kwargs["max_completion_tokens"]
-                        request_kwargs["max_tokens"] = SAFE_TOKEN_LIMIT
-                    retry_needed = True
-                
-                if retry_needed:
-                    try:
-                        response = send_request(request_kwargs)
-                    except Exception as e2:
-                        raise e2
-                else:
-                    raise e
+    @staticmethod
+    def request_name(job):
+        """網路階段：以 prepare() 的結果送出請求並解析檔名"""
+        if not AIService._client:
+            return None, "尚未設定 API Key"
+
+        ext = job['ext']
+
+        try:
+            if job['user_content'] is None:
+                job['user_content'] = AIService.build_user_content(job['file_path'], ext)
+
+            # system prompt 固定不變 (端點可沿用 prompt 快取)，副檔名放在使用者訊息
+            messages = [
+                {"role": "system", "content": AIService.SYSTEM_PROMPT},
+                {"role": "user", "content": [{"type": "text", "text": f"Original extension: {ext}"}] + job['user_content']}
+            ]
+            content = AIService._complete(messages, AIService.SAFE_TOKEN_LIMIT)
 
             # --- 處理回應 ---
-            suggested_name = response.choices[0].message.content.strip()
-            suggested_name = suggested_name.replace("`", "").strip()
-            
-            if not suggested_name.lower().endswith(ext):
-                suggested_name += ext
+            with tracing.span("ai.parse"):
+                suggested_name = AIService._clean_name(content, ext)
+            if suggested_name is None:
+                return None, "AI 回應不是有效的檔名"
 
+            AIService._store(job, suggested_name)
             return suggested_name, "AI 分析完成"
 
         except Exception as e:
-            return None, f"API 請求錯誤: {str(e)}"
\ No newline at end of file
+            return None, f"API 請求錯誤: {str(e)}"
+
+    @staticmethod
+    def _parse_batch_reply(text, count):
+        """解析多檔回應的 JSON 陣列；回傳 {檔案編號 (1 起算): 檔名}，無法解析時回傳空 dict"""
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            items = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+
+        names = {}
+        for pos, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                try:
+                    key = int(item.get("id"))
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(item.get("name"), str):
+                    names[key] = item["name"]
+            elif isinstance(item, str) and len(items) == count:
+                # 模型省略了編號，只回傳依序排列的檔名
+                names[pos] = item
+        return {k: v for k, v in names.items() if 1 <= k <= count}
+
+    @staticmethod
+    def request_names(jobs):
+        """
+        多檔請求：將數個小文字檔的內容 (job['excerpt']) 合併成一個請求，回應為 JSON 陣列。
+        回傳: 與 jobs 對應的 [(檔名或 None, 訊息), ...]；
+        檔名為 None 的項目 (請求失敗、回應缺漏或格式錯誤) 由呼叫端改以 request_name 單獨請求
+        """
+        if not AIService._client:
+            return [(None, "尚未設定 API Key")] * len(jobs)
+
+        sections = [f"=== FILE {i} ({job['ext']}) ===\n{job['excerpt']}" for i, job in enumerate(jobs, 1)]
+        messages = [
+            {"role": "system", "content": AIService.BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": "\n\n".join(sections)}
+        ]
+        token_limit = AIService.SAFE_TOKEN_LIMIT + AIService.BATCH_TOKENS_PER_FILE * len(jobs)
+        try:
+            content = AIService._complete(messages, token_limit)
+        except Exception as e:
+            return [(None, f"API 請求錯誤: {str(e)}")] * len(jobs)
+
+        with tracing.span("ai.parse", files=len(jobs)):
+            names = AIService._parse_batch_reply(content, len(jobs))
+
+        results = []
+        for i, job in enumerate(jobs, 1):
+            name = names.get(i)
+            name = AIService._clean_name(name, job['ext']) if name is not None else None
+            if name is None:
+                results.append((None, "多檔回應中缺少此檔案"))
+                continue
+            AIService._store(job, name)
+            results.append((name, "AI 分析完成"))
+        return results
+
+    @staticmethod
+    def analyze_batch(jobs, on_result=None, should_cancel=None):
+        """
+        以 AIPipeline 並行分析多個檔案 (擷取/編碼在子行程，請求在執行緒池)。
+        jobs: 可迭代的 (uid, file_path)
+        on_result(uid, new_name, msg): 每完成一個檔案呼叫一次 (於工作執行緒)，失敗時 new_name 為 None
+        should_cancel(): 回傳 True 後不再送出新工作，已在途的工作仍會完成
+        回傳: (成功數, [(uid, file_path, 錯誤訊息), ...])
+        """
+        from ai_pipeline import AIPipeline
+        return AIPipeline().run(jobs, on_result, should_cancel)
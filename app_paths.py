@@ -0,0 +1,23 @@
+import os
+import sys
+
+APP_NAME = "AutoRenamer"
+
+
+def data_dir():
+    """
+    程式資料夾 (快取、紀錄檔等)。
+    可用環境變數 AUTORENAMER_HOME 覆寫；Windows 預設 %APPDATA%\\AutoRenamer，其他平台 ~/.autorenamer
+    """
+    path = os.environ.get("AUTORENAMER_HOME")
+    if not path:
+        if sys.platform == "win32" and os.environ.get("APPDATA"):
+            path = os.path.join(os.environ["APPDATA"], APP_NAME)
+        else:
+            path = os.path.join(os.path.expanduser("~"), ".autorenamer")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(*parts):
+    return os.path.join(data_dir(), *parts)
@@ -0,0 +1,206 @@
+"""
+無介面 (headless) 批次重命名。
+
+    python -m autorenamer -p "IMG_(\\d+)" -s "photo_$1" ~/Pictures/*.jpg --dry-run
+    find /data -name "*.pdf" | python -m autorenamer --stdin --ai --dry-run
+
+預覽計畫以 JSON lines 輸出到 stdout，進度與摘要輸出到 stderr。
+不載入任何 GUI 套件；只有使用 --ai 時才載入 AI 相關模組。
+"""
+import argparse
+import json
+import os
+import sys
+
+from dir_cache import NameFolding
+from file_walker import WalkOptions, walk_files, iter_chunks
+from logic import RenameManager
+import tracing
+
+# 每累積這麼多個路徑就加入檔案表一次，避免先把整個清單讀進記憶體
+CHUNK_SIZE = 10000
+
+
+def iter_stdin_paths(null_separated):
+    if null_separated:
+        buf = ""
+        for chunk in iter(lambda: sys.stdin.read(65536), ""):
+            buf += chunk
+            *parts, buf = buf.split("\0")
+            for p in parts:
+                if p:
+                    yield p
+        if buf:
+            yield buf
+    else:
+        for line in sys.stdin:
+            line = line.rstrip("\r\n")
+            if line:
+                yield line
+
+
+def walk_options(args):
+    return WalkOptions(
+        include=args.include,
+        exclude=args.exclude,
+        extensions=[e for item in args.ext for e in item.split(",") if e.strip()] or None,
+        max_depth=args.max_depth
+    )
+
+
+def load_files(manager, args):
+    roots = []
+    paths = []
+    for p in args.paths:
+        if args.recursive and os.path.isdir(p):
+            roots.append(p)
+        else:
+            paths.append(p)
+
+    # 指定的路徑需逐一確認；走訪得到的檔案已知存在，直接加入
+    for chunk in iter_chunks(paths, CHUNK_SIZE):
+        manager.add_files(chunk)
+    if args.stdin:
+        for chunk in iter_chunks(iter_stdin_paths(args.null), CHUNK_SIZE):
+            manager.add_files(chunk)
+    if roots:
+        for chunk in iter_chunks(walk_files(roots, walk_options(args)), CHUNK_SIZE):
+            manager.add_entries(chunk)
+
+
+def run_ai(manager, args):
+    from ai_service import AIService
+
+    if args.model:
+        AIService.MODEL_NAME = args.model
+    if args.concurrency:
+        AIService.MAX_CONCURRENCY = args.concurrency
+    if args.ai_batch is not None:
+        AIService.BATCH_SIZE = max(1, args.ai_batch)
+    # configure 依 MAX_CONCURRENCY 決定連線池大小，必須在設定之後呼叫
+    api_key = args.api_key or os.environ.get("OPENAI_API_KEY")
+    if api_key:
+        AIService.configure(api_key, args.base_url)
+
+    jobs = [(rec.id, rec.path) for rec in manager.files if not rec.is_dir]
+    total = len(jobs)
+    done = [0]
+
+    def on_result(uid, new_name, msg):
+        done[0] += 1
+        if new_name:
+            manager.set_file_override(uid, new_name)
+        else:
+            rec = manager.files.get(uid)
+            print(f"AI 失敗 {rec.path if rec else uid}: {msg}", file=sys.stderr)
+        if not args.quiet:
+            print(f"\rAI 分析 {done[0]}/{total}", end="", file=sys.stderr, flush=True)
+
+    succeeded, failures = AIService.analyze_batch(jobs, on_result)
+    if not args.quiet and total:
+        print(file=sys.stderr)
+    return succeeded, failures
+
+
+def write_plan(previews, include_unchanged, out):
+    for item in previews:
+        if not include_unchanged and item.new == item.original:
+            continue
+        out.write(json.dumps({
+            "old": item.full_old,
+            "new": item.full_new,
+            "status": item.status,
+            "ai": item.is_overridden,
+        }, ensure_ascii=False) + "\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="autorenamer",
+        description="以 RegEx 或 AI 批次重命名檔案 (無介面模式)"
+    )
+    parser.add_argument("paths", nargs="*", help="要重命名的檔案或資料夾")
+    parser.add_argument("--stdin", action="store_true", help="從 stdin 讀取路徑 (每行一個)")
+    parser.add_argument("-0", "--null", action="store_true", help="stdin 路徑以 NUL 分隔 (搭配 find -print0)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="展開資料夾，加入其中所有檔案")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB", help="(搭配 -r) 只加入符合的檔案，可重複指定")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="(搭配 -r) 略過符合的檔案或資料夾，可重複指定")
+    parser.add_argument("--ext", action="append", default=[], metavar="EXT", help="(搭配 -r) 只加入這些副檔名，例如 jpg,png")
+    parser.add_argument("--max-depth", type=int, metavar="N", help="(搭配 -r) 最多往下幾層資料夾 (0 = 只有該資料夾本身)")
+    parser.add_argument("-p", "--pattern", default="", help="RegEx 查找")
+    parser.add_argument("-s", "--replace", default="", help="替換為 (可用 $1, $2 引用群組)")
+    parser.add_argument("--ai", action="store_true", help="以 AI 為每個檔案產生檔名 (優先於 RegEx)")
+    parser.add_argument("--api-key", help="API Key (預設讀取環境變數 OPENAI_API_KEY)")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1"), help="API Endpoint")
+    parser.add_argument("--model", help="AI 模型名稱")
+    parser.add_argument("--concurrency", type=int, help="AI 同時請求數")
+    parser.add_argument("--ai-batch", type=int, metavar="N", help="小型文字檔每 N 個合併成一個 AI 請求 (1 = 每個檔案單獨請求)")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="只輸出計畫，不實際重命名")
+    parser.add_argument("--workers", type=int, help="同時執行的重命名執行緒數 (網路磁碟可調高)")
+    parser.add_argument("--name-compare", choices=["auto"] + list(NameFolding.MODES), default="auto",
+                        help="判斷同名的方式：exact 逐字、case 不分大小寫、unicode 視 NFC/NFD 相同、full 兩者皆是 (auto 依作業系統)")
+    parser.add_argument("--all", action="store_true", help="計畫中也列出檔名不變的項目")
+    parser.add_argument("--force", action="store_true", help="有衝突時仍執行 (衝突項目會被略過)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不輸出進度")
+    parser.add_argument("--recover", choices=["resume", "rollback"], help="處理上次中斷的批次：繼續完成或改回原名")
+    parser.add_argument("--trace", metavar="FILE", help="結束時將各階段耗時與統計輸出到 FILE (同環境變數 AUTORENAMER_TRACE)")
+    parser.add_argument("--trace-format", choices=tracing.Tracer.FORMATS, default="json", help="追蹤輸出格式 (chrome 可在 ui.perfetto.dev 檢視)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.paths and not args.stdin and not args.recover:
+        build_parser().error("請指定路徑或使用 --stdin")
+    if args.trace:
+        tracing.configure(args.trace, args.trace_format)
+
+    manager = RenameManager()
+    manager.dir_cache.set_folding(NameFolding.from_mode(args.name_compare))
+    if args.recover:
+        success, msg = manager.recover(resume=args.recover == "resume")
+        print(msg, file=sys.stderr)
+        if not success:
+            return 2
+        if not args.paths and not args.stdin:
+            return 0
+    elif manager.interrupted is not None and not args.dry_run:
+        state = manager.interrupted
+        state.resolve()
+        print(f"上次的批次在完成 {state.applied_count}/{state.total} 個步驟後中斷，"
+              "請先使用 --recover resume 或 --recover rollback", file=sys.stderr)
+        return 2
+
+    load_files(manager, args)
+    if not manager.files:
+        print("沒有可處理的檔案", file=sys.stderr)
+        return 1
+
+    if args.ai:
+        run_ai(manager, args)
+
+    previews, error, has_conflict = manager.get_preview(args.pattern, args.replace)
+    if error:
+        print(error, file=sys.stderr)
+        return 2
+
+    write_plan(previews, args.all, sys.stdout)
+
+    if args.dry_run:
+        return 1 if has_conflict else 0
+
+    if has_conflict and not args.force:
+        print("檢測到檔名衝突，未執行重命名 (使用 --force 略過衝突項目)", file=sys.stderr)
+        return 1
+
+    if args.workers:
+        manager.executor.workers = args.workers
+    success, msg = manager.execute_rename(previews)
+    print(msg, file=sys.stderr)
+    if manager.last_report and not args.quiet:
+        print(f"執行統計: {manager.last_report}", file=sys.stderr)
+    return 0 if success else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""
+效能基準測試 (從專案根目錄執行)。
+
+    python -m benchmarks.run --sizes 1k,10k,100k
+    python -m benchmarks.run --sizes 1m --only preview,rename
+    python -m benchmarks.run --docs 20 --ai-stub --stub-latency 0.3 --stub-rate-limit 0.05
+    python -m benchmarks.run --docs 20 --ai-endpoint http://127.0.0.1:8765/v1
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+測試資料 (合成的資料夾樹與 PDF/DOCX/XLSX/圖片) 產生在暫存資料夾，結束後刪除；
+結果以 JSON 寫入 benchmarks/results/<commit>.json，可用 compare 比較兩次提交。
+"""
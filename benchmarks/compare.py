@@ -0,0 +1,70 @@
+"""
+比較兩次基準測試的結果。
+
+    python -m benchmarks.compare old.json new.json [--threshold 0.1] [--metric min|median]
+
+比值 = 新 / 舊 (小於 1 代表變快)；超過 1 + threshold 的項目標記為退步，
+有任何退步時結束代碼為 1，可用於 CI。
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(old, new, metric="min", threshold=0.1):
+    """回傳: [(名稱, 舊秒數或 None, 新秒數或 None, 比值或 None, 是否退步), ...]"""
+    old_results = old["results"]
+    new_results = new["results"]
+    rows = []
+    for name in sorted(set(old_results) | set(new_results)):
+        a = old_results.get(name, {}).get(metric)
+        b = new_results.get(name, {}).get(metric)
+        ratio = b / a if a and b is not None else None
+        rows.append((name, a, b, ratio, ratio is not None and ratio > 1 + threshold))
+    return rows
+
+
+def _label(meta):
+    return meta.get("commit", "?") + ("*" if meta.get("dirty") else "")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description="比較兩次基準測試結果")
+    parser.add_argument("old", help="基準 (舊) 結果 JSON")
+    parser.add_argument("new", help="新結果 JSON")
+    parser.add_argument("--metric", choices=["min", "median"], default="min", help="比較的統計值")
+    parser.add_argument("--threshold", type=float, default=0.1, help="變慢超過此比例視為退步 (預設 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    rows = compare(old, new, args.metric, args.threshold)
+    width = max((len(r[0]) for r in rows), default=4)
+
+    def fmt(v):
+        return f"{v:9.4f}s" if v is not None else f"{'-':>10}"
+
+    print(f"{'項目':<{width - 2}}  {_label(old['meta']):>10}  {_label(new['meta']):>10}     比值")
+    regressions = 0
+    for name, a, b, ratio, regressed in rows:
+        mark = ""
+        if regressed:
+            mark = "  退步"
+            regressions += 1
+        elif ratio is not None and ratio < 1 - args.threshold:
+            mark = "  改善"
+        ratio_text = f"{ratio:7.2f}x" if ratio is not None else f"{'-':>8}"
+        print(f"{name:<{width}}  {fmt(a)}  {fmt(b)}  {ratio_text}{mark}")
+
+    if old["meta"].get("cpu_count") != new["meta"].get("cpu_count") or \
+            old["meta"].get("platform") != new["meta"].get("platform"):
+        print("注意: 兩次結果在不同的機器或平台上量測", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""合成測試資料：大量空檔案的資料夾樹，以及 PDF / DOCX / XLSX / 圖片 / 文字檔"""
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+FILES_PER_DIR = 1000
+
+_WORDS = (
+    "invoice report budget meeting quarterly summary project contract travel receipt "
+    "schedule proposal design review minutes sales forecast inventory payroll audit"
+).split()
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_tree(root, count, files_per_dir=FILES_PER_DIR):
+    """
+    建立 count 個空檔案，每個資料夾 files_per_dir 個 (IMG_0000001.jpg ...)。
+    回傳: 所有檔案路徑
+    """
+    paths = []
+    for start in range(0, count, files_per_dir):
+        dir_path = os.path.join(root, f"d{start // files_per_dir:04d}")
+        os.makedirs(dir_path, exist_ok=True)
+        for i in range(start, min(start + files_per_dir, count)):
+            path = os.path.join(dir_path, f"IMG_{i:07d}.jpg")
+            open(path, "wb").close()
+            paths.append(path)
+    return paths
+
+
+def make_pdf(path, rng, pages=5):
+    import fitz
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        y = 72
+        for _ in range(40):
+            page.insert_text((72, y), sentence(rng), fontsize=10)
+            y += 16
+    doc.save(path)
+    doc.close()
+
+
+def make_docx(path, rng, paragraphs=200):
+    body = "".join(
+        f"<w:p><w:r><w:t>{escape(sentence(rng))}</w:t></w:r></w:p>"
+        for _ in range(paragraphs)
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+        z.writestr("_rels/.rels", _DOCX_RELS)
+        z.writestr("word/document.xml", document)
+
+
+def make_xlsx(path, rng, rows=2000, cols=8):
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append([f"col_{c}" for c in range(cols)])
+    for r in range(rows):
+        ws.append([rng.choice(_WORDS) if c % 2 else r * c for c in range(cols)])
+    wb.save(path)
+
+
+def make_image(path, rng, size=(4000, 3000)):
+    """含雜訊的照片尺寸圖片 (雜訊使 JPEG 無法壓得太小，接近真實照片的編碼成本)"""
+    from PIL import Image
+    img = Image.effect_noise(size, 64).convert("RGB")
+    img = img.resize((size[0] // 4, size[1] // 4)).resize(size)
+    if path.lower().endswith(".png"):
+        img.save(path)
+    else:
+        img.save(path, quality=90)
+
+
+def make_text(path, rng, lines=200):
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(lines):
+            f.write(sentence(rng) + "\n")
+
+
+MAKERS = {
+    '.pdf': make_pdf,
+    '.docx': make_docx,
+    '.xlsx': make_xlsx,
+    '.jpg': make_image,
+    '.png': make_image,
+    '.txt': make_text,
+}
+
+
+def make_notes(root, count, seed=0):
+    """count 個只有幾行的小文字檔 (AI 多檔請求的情境)"""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, f"note_{i:04d}.txt")
+        make_text(path, rng, lines=3)
+        paths.append(path)
+    return paths
+
+
+def make_corpus(root, count, extensions=None, seed=0):
+    """
+    每種副檔名各建立 count 個檔案。
+    回傳: {副檔名: [路徑, ...]}
+    """
+    rng = random.Random(seed)
+    corpus = {}
+    os.makedirs(root, exist_ok=True)
+    for ext in extensions or MAKERS:
+        maker = MAKERS[ext]
+        paths = corpus[ext] = []
+        for i in range(count):
+            path = os.path.join(root, f"{ext[1:]}_{i:04d}{ext}")
+            maker(path, rng)
+            paths.append(path)
+    return corpus
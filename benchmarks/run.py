@@ -0,0 +1,267 @@
+"""
+執行基準測試並輸出 JSON 結果。
+
+每個項目重複 --repeat 次，記錄每次的秒數、最小值、中位數與吞吐量 (items / 最小秒數)。
+程式資料夾 (歷史紀錄、日誌、AI 快取) 一律改到暫存資料夾，不會動到使用者的資料。
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from benchmarks.corpus import make_tree, make_corpus, make_notes, parse_size
+from stub_server import StubServer, add_config_arguments, config_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SUITES = ("walk", "preview", "rename", "doc", "ai")
+
+PATTERN = r"IMG_(\d+)"
+REPL = "photo_$1"
+ALT_REPL = "pic_$1"
+
+
+class Recorder:
+    """累積各項目的量測結果；名稱格式為 <項目>/<規模>"""
+    def __init__(self):
+        self.results = {}
+
+    def add(self, name, seconds, items, **extra):
+        entry = self.results.setdefault(name, {"items": items, "runs": []})
+        entry["runs"].append(seconds)
+        entry.update(extra)
+
+    @contextmanager
+    def measure(self, name, items):
+        gc.collect()
+        start = time.perf_counter()
+        yield
+        self.add(name, time.perf_counter() - start, items)
+
+    def summary(self):
+        out = {}
+        for name, entry in self.results.items():
+            runs = entry["runs"]
+            best = min(runs)
+            out[name] = dict(entry, min=best, median=statistics.median(runs),
+                             rate=entry["items"] / best if best > 0 else None)
+        return out
+
+
+def git_info():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "subject": git("log", "-1", "--format=%s"),
+    }
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def bench_tree(rec, workdir, size, repeat, suites, workers):
+    from file_walker import WalkOptions, walk_files
+    from logic import RenameManager
+
+    root = tempfile.mkdtemp(prefix=f"tree{size}_", dir=workdir)
+    log(f"建立 {size} 個檔案 ...")
+    make_tree(root, size)
+    label = f"/{size}"
+
+    for r in range(repeat):
+        log(f"  [{size}] 第 {r + 1}/{repeat} 輪")
+        with rec.measure("walk" + label, size):
+            entries = list(walk_files([root], WalkOptions()))
+
+        manager = RenameManager()
+        if workers:
+            manager.executor.workers = workers
+        with rec.measure("ingest" + label, size):
+            manager.add_entries(entries)
+        del entries
+
+        if "preview" in suites:
+            with rec.measure("preview.cold" + label, size):
+                manager.get_preview(PATTERN, REPL)
+            with rec.measure("preview.memo" + label, size):
+                manager.get_preview(PATTERN, REPL)
+            with rec.measure("preview.rule_change" + label, size):
+                manager.get_preview(PATTERN, ALT_REPL)
+            # 改動一個檔案後重算：逐檔 RegEx 結果可沿用，只重建狀態
+            first = manager.files.rows()[0]
+            manager.set_file_override(first.id, "override_0.jpg")
+            with rec.measure("preview.incremental" + label, size):
+                manager.get_preview(PATTERN, REPL)
+            manager.set_file_override(first.id, None)
+
+        if "rename" in suites:
+            previews, _, _ = manager.get_preview(PATTERN, REPL)
+            with rec.measure("rename.execute" + label, size):
+                success, msg = manager.execute_rename(previews)
+            if not success:
+                raise RuntimeError(msg)
+            with rec.measure("rename.undo" + label, size):
+                success, msg = manager.undo()
+            if not success:
+                raise RuntimeError(msg)
+            with rec.measure("rename.redo" + label, size):
+                manager.redo()
+            manager.undo() # 還原檔名供下一輪使用
+        del manager
+
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_docs(rec, workdir, count, repeat):
+    from doc_parser import DocParser
+    from image_prep import prepare_image
+
+    root = tempfile.mkdtemp(prefix="docs_", dir=workdir)
+    log(f"建立文件與圖片 (每種 {count} 個) ...")
+    corpus = make_corpus(root, count, ['.pdf', '.docx', '.xlsx', '.jpg', '.png'])
+    for _ in range(repeat):
+        for ext in ('.pdf', '.docx', '.xlsx'):
+            with rec.measure(f"doc.extract{ext}/{count}", count):
+                for path in corpus[ext]:
+                    DocParser.extract_content(path)
+        for ext in ('.jpg', '.png'):
+            with rec.measure(f"image.prepare{ext}/{count}", count):
+                for path in corpus[ext]:
+                    prepare_image(path)
+    return corpus
+
+
+def bench_ai(rec, workdir, endpoint, count, repeat, concurrency, doc_corpus=None):
+    from ai_service import AIService
+
+    AIService.CACHE_ENABLED = False # 每輪都要真的送出請求
+    if concurrency:
+        AIService.MAX_CONCURRENCY = concurrency
+    AIService.configure(os.environ.get("OPENAI_API_KEY", "bench"), endpoint)
+
+    root = tempfile.mkdtemp(prefix="ai_", dir=workdir)
+    suites = {
+        "ai.batch.text": make_corpus(root, count, ['.txt'])['.txt'],
+        "ai.batch.notes": make_notes(os.path.join(root, "notes"), count),
+    }
+    if doc_corpus:
+        suites["ai.batch.mixed"] = [p for paths in doc_corpus.values() for p in paths]
+
+    for _ in range(repeat):
+        for name, paths in suites.items():
+            jobs = list(enumerate(paths))
+            gc.collect()
+            start = time.perf_counter()
+            succeeded, failures = AIService.analyze_batch(jobs)
+            rec.add(f"{name}/{len(jobs)}", time.perf_counter() - start, len(jobs), failures=len(failures))
+            if failures:
+                log(f"  {name}: {len(failures)} 個失敗，例如 {failures[0][2]}")
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="AutoRenamer 效能基準測試")
+    parser.add_argument("--sizes", default="1k,10k,100k", help="資料夾樹的檔案數，以逗號分隔 (例如 1k,10k,100k,1m)")
+    parser.add_argument("--only", default=",".join(SUITES), help=f"只執行這些項目，以逗號分隔 ({', '.join(SUITES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="每個項目重複次數")
+    parser.add_argument("--docs", type=int, default=10, help="每種文件/圖片格式產生幾個檔案 (0 = 略過)")
+    parser.add_argument("--workers", type=int, help="重命名執行緒數")
+    parser.add_argument("--ai-endpoint", help="AI 測試用的 API Endpoint；未指定 (也沒有 --ai-stub) 時略過 AI 項目")
+    parser.add_argument("--ai-stub", action="store_true", help="啟動內建的模擬伺服器 (stub_server) 作為 AI Endpoint")
+    parser.add_argument("--ai-files", type=int, default=200, help="AI 測試的文字檔數量")
+    parser.add_argument("--ai-concurrency", type=int, help="AI 同時請求數")
+    parser.add_argument("--workdir", help="產生測試資料的位置 (預設為系統暫存資料夾；可指定網路磁碟)")
+    parser.add_argument("-o", "--output", help="結果 JSON 路徑 (預設 benchmarks/results/<commit>.json)")
+    add_config_arguments(parser.add_argument_group("模擬伺服器 (搭配 --ai-stub)"), prefix="stub-")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    suites = {s.strip() for s in args.only.split(",") if s.strip()}
+    unknown = suites - set(SUITES)
+    if unknown:
+        log(f"未知的項目: {', '.join(sorted(unknown))}")
+        return 2
+
+    workdir = tempfile.mkdtemp(prefix="autorenamer_bench_", dir=args.workdir)
+    os.environ["AUTORENAMER_HOME"] = os.path.join(workdir, "home")
+    rec = Recorder()
+    started = time.perf_counter()
+    stub = None
+    try:
+        if suites & {"walk", "preview", "rename"}:
+            for size in (parse_size(s) for s in args.sizes.split(",") if s.strip()):
+                bench_tree(rec, workdir, size, args.repeat, suites, args.workers)
+
+        doc_corpus = None
+        if args.docs > 0 and suites & {"doc", "ai"}:
+            if "doc" in suites:
+                doc_corpus = bench_docs(rec, workdir, args.docs, args.repeat)
+            else:
+                doc_corpus = make_corpus(os.path.join(workdir, "docs"), args.docs,
+                                         ['.pdf', '.docx', '.xlsx', '.jpg', '.png'])
+
+        if "ai" in suites:
+            endpoint = args.ai_endpoint
+            if args.ai_stub and not endpoint:
+                stub = StubServer(config_from_args(args, prefix="stub-")).start()
+                endpoint = stub.base_url
+            if endpoint:
+                log(f"AI 測試: {endpoint}")
+                bench_ai(rec, workdir, endpoint, args.ai_files, args.repeat,
+                         args.ai_concurrency, doc_corpus)
+            else:
+                log("未指定 --ai-endpoint 或 --ai-stub，略過 AI 項目")
+    finally:
+        if stub is not None:
+            stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    info = git_info()
+    report = {
+        "meta": dict(
+            info,
+            date=datetime.now().isoformat(timespec="seconds"),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpu_count=os.cpu_count(),
+            argv=sys.argv[1:] if argv is None else list(argv),
+            elapsed=time.perf_counter() - started,
+            ai_stub=stub.stats() if stub is not None else None,
+        ),
+        "results": rec.summary(),
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, info["commit"] + ("-dirty" if info["dirty"] else "") + ".json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    width = max((len(n) for n in report["results"]), default=0)
+    for name, r in report["results"].items():
+        rate = f"{r['rate']:.0f}/s" if r["rate"] else "-"
+        log(f"{name:<{width}}  {r['min']:9.4f}s  {rate:>12}")
+    log(f"結果已寫入 {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
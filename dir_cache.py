@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import unicodedata
+
+
+def _nfc(name):
+    return unicodedata.normalize('NFC', name)
+
+
+def _nfc_lower(name):
+    return unicodedata.normalize('NFC', name).lower()
+
+
+class NameFolding:
+    """
+    檔名比較方式。
+    case: 不分大小寫 (Windows、macOS 預設)
+    unicode: 視 NFC / NFD 為同一個名稱 (macOS 預設；從 macOS 匯出的網路磁碟也常見)
+    key 為 None 時代表逐字比較，呼叫端可以直接用原檔名查表。
+    """
+    __slots__ = ('case', 'unicode', 'key')
+
+    MODES = {
+        'exact': (False, False),
+        'case': (True, False),
+        'unicode': (False, True),
+        'full': (True, True),
+    }
+
+    def __init__(self, case=False, unicode=False):
+        self.case = case
+        self.unicode = unicode
+        if case and unicode:
+            self.key = _nfc_lower
+        elif case:
+            self.key = str.lower
+        elif unicode:
+            self.key = _nfc
+        else:
+            self.key = None
+
+    @classmethod
+    def for_platform(cls, platform=None):
+        platform = platform or sys.platform
+        if platform == "darwin":
+            return cls(case=True, unicode=True)
+        if platform == "win32":
+            return cls(case=True)
+        return cls()
+
+    @classmethod
+    def from_mode(cls, mode):
+        """mode: 'auto' 或 MODES 其中之一"""
+        if mode in (None, 'auto'):
+            return cls.for_platform()
+        case, uni = cls.MODES[mode]
+        return cls(case=case, unicode=uni)
+
+
+class DirectorySnapshot:
+    """
+    單一資料夾的名稱清單 (name -> is_dir)，以一次 os.scandir 建立。
+    需要折疊比較時另外建立 折疊後名稱 -> 實際名稱 的索引 (第一次查詢時才建立)。
+    區分大小寫的磁碟上可能有多個名稱折疊後相同 (A.txt 與 a.txt、NFC 與 NFD)，
+    這些鍵記在 _shared，移除其中一個時重建索引，避免其餘同名項目查不到。
+    """
+    __slots__ = ('path', 'entries', 'loaded_at', 'key', '_keys', '_shared')
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.entries = {}
+        self.loaded_at = 0.0
+        self.key = key
+        self._keys = None
+        self._shared = None
+
+    def load(self):
+        """重新掃描；回傳內容是否有變動"""
+        entries = {}
+        try:
+            with os.scandir(self.path or os.curdir) as it:
+                for entry in it:
+                    try:
+                        entries[entry.name] = entry.is_dir()
+                    except OSError:
+                        entries[entry.name] = False
+        except OSError:
+            # 資料夾不存在或無法讀取，視為空
+            pass
+        changed = entries != self.entries
+        self.entries = entries
+        self._keys = None
+        self.loaded_at = time.monotonic()
+        return changed
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def lookup(self, name):
+        """回傳資料夾中與 name 視為同名的實際檔名，沒有則回傳 None"""
+        if self.key is None:
+            return name if name in self.entries else None
+        if self._keys is None:
+            keys = {}
+            shared = set()
+            for n in self.entries:
+                k = self.key(n)
+                if keys.setdefault(k, n) != n:
+                    shared.add(k)
+            self._keys = keys
+            self._shared = shared
+        return self._keys.get(self.key(name))
+
+    def add(self, name, is_dir):
+        self.entries[name] = is_dir
+        if self._keys is not None:
+            k = self.key(name)
+            if self._keys.setdefault(k, name) != name:
+                self._shared.add(k)
+
+    def remove(self, name):
+        """回傳被移除的項目是否為資料夾"""
+        is_dir = self.entries.pop(name, False)
+        if self._keys is not None:
+            k = self.key(name)
+            if k in self._shared:
+                # 可能還有其他同鍵的名稱，下次查詢時重建
+                self._keys = None
+            elif self._keys.get(k) == name:
+                del self._keys[k]
+        return is_dir
+
+
+class DirectoryCache:
+    """
+    以資料夾為單位快取檔名清單，取代逐檔 os.path.exists。
+    快照超過 max_age 秒會在下次存取時重新掃描；本程式自己的重命名則直接更新快照。
+    watched 中的資料夾由 fs_watcher 的事件 (note_entry) 更新，快照不會過期。
+    folding: NameFolding，決定「同名」的判斷方式，預設依作業系統
+    version 在任何快照內容變動時遞增。
+    """
+    def __init__(self, max_age=5.0, folding=None):
+        self.max_age = max_age
+        self.folding = folding or NameFolding.for_platform()
+        self._dirs = {}
+        self.watched = set()
+        self.version = 0
+
+    def set_folding(self, folding):
+        self.folding = folding
+        self.invalidate()
+
+    def name_key(self, name):
+        key = self.folding.key
+        return name if key is None else key(name)
+
+    def path_key(self, path):
+        """用於比較完整路徑的 key (只折疊檔名部分)"""
+        key = self.folding.key
+        if key is None:
+            return path
+        dir_name, name = os.path.split(path)
+        return os.path.join(dir_name, key(name))
+
+    def snapshot(self, dir_path):
+        snap = self._dirs.get(dir_path)
+        if snap is None:
+            snap = self._dirs[dir_path] = DirectorySnapshot(dir_path, self.folding.key)
+            if snap.load():
+                self.version += 1
+        elif (self.max_age is not None and dir_path not in self.watched
+                and time.monotonic() - snap.loaded_at > self.max_age):
+            if snap.load():
+                self.version += 1
+        return snap
+
+    def refresh(self, dir_path):
+        snap = self._dirs.get(dir_path)
+        if snap is None:
+            return self.snapshot(dir_path)
+        if snap.load():
+            self.version += 1
+        return snap
+
+    def invalidate(self, dir_path=None):
+        self.version += 1
+        if dir_path is None:
+            self._dirs.clear()
+        else:
+            self._dirs.pop(dir_path, None)
+
+    def exists(self, path):
+        dir_name, name = os.path.split(path)
+        return name in self.snapshot(dir_name)
+
+    def note_entry(self, dir_path, name, is_dir):
+        """
+        依外部變動更新已載入的快照；is_dir 為 None 表示該名稱已不存在。
+        回傳: 快照內容是否有變動
+        """
+        snap = self._dirs.get(dir_path)
+        if snap is None:
+            return False
+        if is_dir is None:
+            if name not in snap.entries:
+                return False
+            snap.remove(name)
+        else:
+            if name in snap.entries and snap.entries[name] == is_dir:
+                return False
+            snap.add(name, is_dir)
+        self.version += 1
+        return True
+
+    def note_rename(self, old_path, new_path):
+        self.version += 1
+        old_dir, old_name = os.path.split(old_path)
+        new_dir, new_name = os.path.split(new_path)
+        old_snap = self._dirs.get(old_dir)
+        is_dir = False
+        if old_snap is not None:
+            is_dir = old_snap.remove(old_name)
+        new_snap = self._dirs.get(new_dir)
+        if new_snap is not None:
+            new_snap.add(new_name, is_dir)
@@ -1,95 +1,132 @@
 import os
-import openpyxl
-from docx import Document
-import fitz
+import sys
+import time
+import zipfile
+from xml.etree.ElementTree import iterparse
+# openpyxl 與 fitz (PyMuPDF) 載入較慢，第一次解析該格式時才載入
+
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+class ExtractionBudget:
+    """文件擷取的上限：字元數、頁數 (PDF)、列數 (Excel) 與耗時，任一項用完即停止"""
+    __slots__ = ('max_chars', 'max_pages', 'max_rows', 'max_seconds')
+
+    def __init__(self, max_chars=3000, max_pages=10, max_rows=2000, max_seconds=5.0):
+        self.max_chars = max_chars
+        self.max_pages = max_pages
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+
+class _Collector:
+    """依預算累積文字片段，維持累計長度以避免重複加總"""
+    def __init__(self, budget):
+        self.budget = budget
+        self.parts = []
+        self.length = 0
+        self.deadline = time.monotonic() + budget.max_seconds
+
+    def add(self, text):
+        """加入一段文字；回傳 False 表示字元預算已用完"""
+        if text:
+            self.parts.append(text)
+            self.length += len(text)
+        return self.length < self.budget.max_chars
+
+    def expired(self):
+        return time.monotonic() > self.deadline
+
+    def result(self):
+        return "\n".join(self.parts)[:self.budget.max_chars]
 
 class DocParser:
     MAX_CHARS = 3000
 
     @staticmethod
-    def extract_content(file_path):
+    def default_budget():
+        return ExtractionBudget(max_chars=DocParser.MAX_CHARS)
+
+    @staticmethod
+    def extract_content(file_path, budget=None):
         """
         根據副檔名分發處理邏輯。
+        budget: ExtractionBudget，預設為 DocParser.default_budget()
         回傳: (str) 文件內容摘要，若失敗則回傳 None
         """
         ext = os.path.splitext(file_path)[1].lower()
+        budget = budget or DocParser.default_budget()
 
         try:
             if ext == '.xlsx':
-                return DocParser._read_xlsx(file_path)
+                return DocParser._read_xlsx(file_path, budget)
             elif ext == '.docx':
-                return DocParser._read_docx(file_path)
+                return DocParser._read_docx(file_path, budget)
             elif ext == '.pdf':
-                return DocParser._read_pdf(file_path)
+                return DocParser._read_pdf(file_path, budget)
             return None
         except Exception as e:
-            print(f"解析文件失敗 {file_path}: {e}")
+            print(f"解析文件失敗 {file_path}: {e}", file=sys.stderr)
             return None
 
     @staticmethod
-    def _read_xlsx(file_path):
-        text_content = []
+    def _read_xlsx(file_path, budget):
+        import openpyxl
+        collector = _Collector(budget)
         try:
             workbook = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
-            sheet = workbook.active
-            for row in sheet.iter_rows(values_only=True):
-                row_items = [str(cell).strip() for cell in row if cell is not None]
-                row_text = " ".join(row_items)
-                
-                if row_text:
-                    text_content.append(row_text)
-                
-                if sum(len(t) for t in text_content) > DocParser.MAX_CHARS:
-                    break
-            workbook.close()
+            try:
+                sheet = workbook.active
+                for row in sheet.iter_rows(max_row=budget.max_rows, values_only=True):
+                    row_items = [str(cell).strip() for cell in row if cell is not None]
+                    if not collector.add(" ".join(row_items)) or collector.expired():
+                        break
+            finally:
+                workbook.close()
         except Exception:
             pass
-            
-        return "\n".join(text_content)
+
+        return collector.result()
 
     @staticmethod
-    def _read_docx(file_path):
-        text_content = []
-        current_len = 0
+    def _read_docx(file_path, budget):
+        """直接串流解析 word/document.xml，不建立整份文件模型"""
+        collector = _Collector(budget)
         try:
-            doc = Document(file_path)
-            for para in doc.paragraphs:
-                text = para.text.strip()
-                if text:
-                    text_content.append(text)
-                    current_len += len(text)
-                    if current_len > DocParser.MAX_CHARS:
-                        break
+            with zipfile.ZipFile(file_path) as zf, zf.open('word/document.xml') as xml:
+                para = []
+                for _, elem in iterparse(xml, events=('end',)):
+                    if elem.tag == _W_NS + 't':
+                        if elem.text:
+                            para.append(elem.text)
+                    elif elem.tag == _W_NS + 'p':
+                        text = "".join(para).strip()
+                        para = []
+                        elem.clear()
+                        if not collector.add(text) or collector.expired():
+                            break
         except Exception:
             pass
-            
-        return "\n".join(text_content)
+
+        return collector.result()
 
     @staticmethod
-    def _read_pdf(file_path):
-        text_content = []
-        current_len = 0
-        
+    def _read_pdf(file_path, budget):
+        import fitz
+        collector = _Collector(budget)
+
         try:
             with fitz.open(file_path) as doc:
-                # max_pages = min(len(doc), 5)
-                max_pages = len(doc)
-                
+                max_pages = min(len(doc), budget.max_pages)
+
                 for i in range(max_pages):
-                    page = doc[i]
-                    text = page.get_text("text").strip()
-                    
-                    if text:
-                        text_content.append(text)
-                        current_len += len(text)
-                        if current_len > DocParser.MAX_CHARS:
-                            break
+                    text = doc[i].get_text("text").strip()
+                    if not collector.add(text) or collector.expired():
+                        break
         except Exception as e:
-            print(f"PDF 讀取錯誤: {e}")
-            
-        result = "\n".join(text_content)
+            print(f"PDF 讀取錯誤: {e}", file=sys.stderr)
+
+        result = collector.result()
 
         if not result.strip():
             return "[PDF is scanned image or encrypted, content unreadable]"
-            
-        return result
\ No newline at end of file
+
+        return result
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import threading
+
+from app_paths import data_path
+
+
+class EndpointCapabilities:
+    """
+    記錄每個 (API Endpoint, 模型) 接受的請求參數，例如：
+        {"token_param": "max_completion_tokens", "reasoning_effort": true}
+    同時快取在記憶體與磁碟 (JSON)，之後的請求第一次就能送出正確格式。
+    """
+    def __init__(self, path=None):
+        self.path = path or data_path("endpoint_caps.json")
+        self._lock = threading.Lock()
+        self._caps = None
+
+    @staticmethod
+    def make_key(base_url, model):
+        return f"{base_url.rstrip('/')}|{model}"
+
+    def _load(self):
+        if self._caps is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._caps = json.load(f)
+            except (OSError, ValueError):
+                self._caps = {}
+        return self._caps
+
+    def get(self, base_url, model):
+        with self._lock:
+            caps = self._load().get(self.make_key(base_url, model))
+            return dict(caps) if caps else None
+
+    def set(self, base_url, model, caps):
+        with self._lock:
+            self._load()[self.make_key(base_url, model)] = dict(caps)
+            self._save()
+
+    def forget(self, base_url, model):
+        with self._lock:
+            if self._load().pop(self.make_key(base_url, model), None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._caps, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: 無法儲存 API 能力快取 ({e})", file=sys.stderr)
@@ -0,0 +1,87 @@
+"""
+跨行程的檔案鎖 (POSIX flock / Windows msvcrt)。
+同一個資料夾可能同時被多個 AutoRenamer 使用 (例如 GUI 與排程執行的 CLI)，
+重命名日誌與復原紀錄以此避免互相覆蓋或誤判。行程結束 (含當機) 時鎖會自動釋放。
+"""
+import os
+import sys
+import time
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+# Windows 鎖定的是位元組範圍；鎖在遠超過檔尾的位置，不妨礙其他行程讀取內容
+_WIN_OFFSET = 0x7FFFFFFF
+
+
+def try_lock(fd):
+    """非阻塞地取得獨佔鎖；已被其他行程持有時回傳 False"""
+    try:
+        if sys.platform == "win32":
+            os.lseek(fd, _WIN_OFFSET, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def lock(fd, poll=0.05):
+    """取得獨佔鎖，必要時等待"""
+    if sys.platform == "win32":
+        while not try_lock(fd):
+            time.sleep(poll)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def unlock(fd):
+    if sys.platform == "win32":
+        os.lseek(fd, _WIN_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def open_locked(path):
+    """
+    建立 (或開啟) path 並取得獨佔鎖，回傳 fd。
+    等待期間檔案可能被其他行程清除，因此確認鎖住的仍是 path 目前指向的檔案。
+    """
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        lock(fd)
+        try:
+            same = os.path.samestat(os.fstat(fd), os.stat(path))
+        except OSError:
+            same = False
+        if same:
+            return fd
+        unlock(fd)
+        os.close(fd)
+
+
+def release(fd):
+    try:
+        unlock(fd)
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    """以 with 使用的獨佔鎖；鎖檔本身保留不刪除"""
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = open_locked(self.path)
+        return self
+
+    def __exit__(self, *exc):
+        fd, self._fd = self._fd, None
+        release(fd)
+        return False
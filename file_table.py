@@ -0,0 +1,173 @@
+import bisect
+import heapq
+import itertools
+
+from path_table import DIRS
+
+
+def _path_key(record):
+    return record.path
+
+
+class FileRecord:
+    """
+    單一檔案紀錄 (以 __slots__ 取代 dict，節省大量檔案時的記憶體)。
+    路徑拆成資料夾索引 (path_table.DIRS) 與檔名保存，完整路徑在需要時才組合。
+    """
+    __slots__ = ('id', 'dir', 'name', 'is_dir', 'override_name')
+
+    def __init__(self, uid, dir_index, name, is_dir):
+        self.id = uid
+        self.dir = dir_index
+        self.name = name
+        self.is_dir = is_dir
+        self.override_name = None
+
+    @property
+    def path(self):
+        return DIRS.join(self.dir, self.name)
+
+    @property
+    def dir_path(self):
+        return DIRS.path(self.dir)
+
+
+class FileTable:
+    """
+    依路徑排序的檔案表，附 id 與路徑索引。
+    - 路徑索引為 {資料夾索引: {檔名: 紀錄}}，不另外保存完整路徑字串
+    - get / find_path 皆為 O(1)
+    - 新增採附加 (整批排在最後)、排序插入 (少量) 或合併 (大量)，不重新排序整張表
+    - relocate 只更新索引，排序延後到下次讀取時一次完成
+    - version 在每次變動時遞增，供預覽判斷快取的結果是否仍有效
+    """
+    # 新增數量低於此值時逐筆 insort，否則整批排序後合併
+    INSORT_LIMIT = 64
+
+    def __init__(self):
+        self._rows = []
+        self._by_id = {}
+        self._by_dir = {}
+        self._ids = itertools.count(1)
+        self._dirty = False
+        self.version = 0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __bool__(self):
+        return bool(self._by_id)
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __contains__(self, path):
+        return self.find_path(path) is not None
+
+    def rows(self):
+        """回傳依路徑排序的紀錄列表 (請勿直接修改)"""
+        if self._dirty:
+            self._rows.sort(key=_path_key)
+            self._dirty = False
+        return self._rows
+
+    def get(self, uid):
+        return self._by_id.get(uid)
+
+    def find_path(self, path):
+        dir_index, name = DIRS.lookup(path)
+        names = self._by_dir.get(dir_index)
+        return names.get(name) if names else None
+
+    def clear(self):
+        self.version += 1
+        self._rows = []
+        self._by_id.clear()
+        self._by_dir.clear()
+        self._dirty = False
+
+    def extend(self, entries):
+        """
+        批次加入 (path, is_dir)，已存在的路徑會被略過。
+        回傳: 新增的紀錄列表
+        """
+        added = []
+        split = DIRS.split
+        by_dir = self._by_dir
+        for path, is_dir in entries:
+            dir_index, name = split(path)
+            names = by_dir.get(dir_index)
+            if names is None:
+                names = by_dir[dir_index] = {}
+            elif name in names:
+                continue
+            rec = FileRecord(next(self._ids), dir_index, name, is_dir)
+            self._by_id[rec.id] = rec
+            names[name] = rec
+            added.append((path, rec))
+
+        if not added:
+            return []
+
+        self.version += 1
+        rows = self.rows()
+        # 以傳入的路徑字串排序，不必為每筆紀錄重新組合路徑 (路徑不重複，不會比較到紀錄本身)
+        added.sort()
+        first_path = added[0][0]
+        added = [rec for _, rec in added]
+        if not rows or rows[-1].path < first_path:
+            # 依序走訪資料夾時每批都排在最後，直接附加即可
+            rows.extend(added)
+        elif len(added) < self.INSORT_LIMIT:
+            for rec in added:
+                bisect.insort(rows, rec, key=_path_key)
+        else:
+            self._rows = list(heapq.merge(rows, added, key=_path_key))
+        return added
+
+    def remove(self, uid):
+        rec = self._by_id.pop(uid, None)
+        if rec is None:
+            return None
+        self.version += 1
+        self._unindex(rec)
+        rows = self.rows()
+        i = bisect.bisect_left(rows, rec.path, key=_path_key)
+        while rows[i] is not rec:
+            i += 1
+        del rows[i]
+        return rec
+
+    def remove_many(self, uids):
+        """一次移除多筆，成本為 O(n) 而非每筆 O(n)"""
+        removed = 0
+        for uid in uids:
+            rec = self._by_id.pop(uid, None)
+            if rec is not None:
+                self._unindex(rec)
+                removed += 1
+        if removed:
+            self.version += 1
+            by_id = self._by_id
+            self._rows = [r for r in self._rows if by_id.get(r.id) is r]
+        return removed
+
+    def relocate(self, rec, new_path):
+        """更新紀錄路徑；排序延後至下次 rows()"""
+        self.version += 1
+        self._unindex(rec)
+        rec.dir, rec.name = DIRS.split(new_path)
+        self._by_dir.setdefault(rec.dir, {})[rec.name] = rec
+        self._dirty = True
+
+    def _unindex(self, rec):
+        names = self._by_dir.get(rec.dir)
+        if names is not None and names.get(rec.name) is rec:
+            del names[rec.name]
+            if not names:
+                del self._by_dir[rec.dir]
+
+    def set_override(self, rec, name):
+        if rec.override_name != name:
+            rec.override_name = name
+            self.version += 1
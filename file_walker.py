@@ -0,0 +1,125 @@
+import fnmatch
+import os
+import sys
+import threading
+
+
+class WalkOptions:
+    """
+    遞迴加入資料夾時的篩選條件。
+    include / exclude: glob 列表；不含路徑分隔符號時比對檔名，否則比對相對於根目錄的路徑 (以 / 分隔)
+    extensions: 副檔名集合 (例如 {'.jpg', '.png'})，None 表示不限
+    max_depth: 0 表示只列出根目錄本身的檔案，None 表示不限
+    exclude 也會套用在資料夾上，符合的資料夾整個略過
+    """
+    __slots__ = ('include', 'exclude', 'extensions', 'max_depth', 'follow_symlinks')
+
+    def __init__(self, include=(), exclude=(), extensions=None, max_depth=None, follow_symlinks=False):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.extensions = {self.normalize_ext(e) for e in extensions} if extensions else None
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+
+    @staticmethod
+    def normalize_ext(ext):
+        ext = ext.strip().lower()
+        return ext if ext.startswith('.') else '.' + ext
+
+    @staticmethod
+    def _match(patterns, name, rel_path):
+        for pat in patterns:
+            if fnmatch.fnmatch(rel_path if '/' in pat else name, pat):
+                return True
+        return False
+
+    def accept_file(self, name, rel_path):
+        if self.extensions is not None and os.path.splitext(name)[1].lower() not in self.extensions:
+            return False
+        if self.include and not self._match(self.include, name, rel_path):
+            return False
+        return not self._match(self.exclude, name, rel_path)
+
+    def accept_dir(self, name, rel_path):
+        return not self._match(self.exclude, name, rel_path)
+
+
+def _sorted_entries(path, follow_symlinks):
+    """
+    讀取資料夾並排序。資料夾以「名稱 + 分隔符號」排序，
+    使深度優先走訪輸出的完整路徑恰好依字串遞增，檔案表可直接附加而不需合併。
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = []
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                except OSError:
+                    continue
+                entries.append((entry.name + os.sep if is_dir else entry.name, entry, is_dir))
+    except OSError as e:
+        print(f"無法讀取資料夾 {path}: {e}", file=sys.stderr)
+        return []
+    entries.sort(key=lambda x: x[0])
+    return entries
+
+
+def walk_files(roots, options=None):
+    """
+    以 os.scandir 延遲走訪 roots 下的檔案，逐一產生 (path, is_dir=False)。
+    只會在需要時讀取下一個資料夾，呼叫端可隨時停止迭代。
+    """
+    options = options or WalkOptions()
+    for root in sorted(os.path.normpath(r) for r in roots):
+        # 堆疊中每層為 (迭代器, 深度, 相對路徑前綴)
+        stack = [(iter(_sorted_entries(root, options.follow_symlinks)), 0, "")]
+        while stack:
+            it, depth, prefix = stack[-1]
+            item = next(it, None)
+            if item is None:
+                stack.pop()
+                continue
+            _, entry, is_dir = item
+            rel_path = prefix + entry.name
+            if is_dir:
+                if options.max_depth is not None and depth >= options.max_depth:
+                    continue
+                if options.accept_dir(entry.name, rel_path):
+                    stack.append((iter(_sorted_entries(entry.path, options.follow_symlinks)), depth + 1, rel_path + "/"))
+            elif options.accept_file(entry.name, rel_path):
+                yield entry.path, False
+
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def start_ingest(manager, roots, options=None, on_progress=None, on_done=None, chunk_size=2000):
+    """
+    在背景執行緒走訪資料夾並分批加入 manager 的檔案表。
+    on_progress(已加入數) 於每批之後呼叫，on_done(已加入數, 是否被取消) 於結束時呼叫 (皆在背景執行緒)。
+    回傳: threading.Event，set() 後會在下一批停止
+    """
+    cancel = threading.Event()
+
+    def task():
+        added = 0
+        for chunk in iter_chunks(walk_files(roots, options), chunk_size):
+            if cancel.is_set():
+                break
+            added += manager.add_entries(chunk)
+            if on_progress:
+                on_progress(added)
+        if on_done:
+            on_done(added, cancel.is_set())
+
+    threading.Thread(target=task, daemon=True).start()
+    return cancel
@@ -0,0 +1,233 @@
+"""
+以 Linux inotify 監看資料夾 (透過 ctypes 直接呼叫 libc，不依賴第三方套件)。
+其他平台或無法使用 inotify 時 available() 回傳 False，呼叫端維持輪詢 (DirectoryCache 的 max_age)。
+
+事件在背景執行緒讀取，收集 BATCH_DELAY 秒內的事件後整批交給 on_events：
+    [(種類, 資料夾路徑, 檔名, cookie), ...]
+種類為 "create"、"delete"、"moved_from"、"moved_to"，成對的移動有相同的 cookie；
+"reset" 表示該資料夾 (資料夾路徑為 None 時是全部) 的事件已不完整，例如資料夾本身被移動、刪除或事件佇列溢位。
+事件只是提示，呼叫端應以 entry_type() (lstat) 確認實際狀態。
+"""
+import ctypes
+import errno
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+_EVENT = struct.Struct("iIII") # wd, mask, cookie, len；其後為 len 位元組、以 NUL 補齊的檔名
+_KINDS = (
+    (IN_CREATE, "create"),
+    (IN_DELETE, "delete"),
+    (IN_MOVED_FROM, "moved_from"),
+    (IN_MOVED_TO, "moved_to"),
+)
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        _libc = False
+        if sys.platform.startswith("linux"):
+            try:
+                libc = ctypes.CDLL(None, use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc or None
+
+
+def available():
+    return _load_libc() is not None
+
+
+def entry_type(path):
+    """以 lstat 確認：不存在回傳 None，否則回傳是否為資料夾 (符號連結依目標判斷，與 os.scandir 的 is_dir() 相同)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if stat.S_ISLNK(st.st_mode):
+        return os.path.isdir(path)
+    return stat.S_ISDIR(st.st_mode)
+
+
+def _os_error(path=None):
+    code = ctypes.get_errno()
+    return OSError(code, os.strerror(code), path)
+
+
+class DirectoryWatcher:
+    """
+    監看多個資料夾 (不含子資料夾) 中名稱的新增、刪除與移動。
+    on_events 在監看執行緒中呼叫，例外會被印出後忽略。
+    """
+    BATCH_DELAY = 0.05
+    MAX_BATCH = 10000
+    MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK)
+
+    def __init__(self, on_events):
+        self.on_events = on_events
+        self._fd = -1
+        self._wake = None # (讀取端, 寫入端)，用來喚醒等待中的執行緒
+        self._closed = False # _run 結束後 fd 已關閉 (編號可能已被重複使用)，不可再寫入
+        self._paths = {} # wd -> 資料夾路徑
+        self._wds = {} # 資料夾路徑 -> wd
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        libc = _load_libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "此平台不支援 inotify")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise _os_error()
+        self._fd = fd
+        self._wake = os.pipe()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="fs-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """停止監看；wait=False 時不等待執行緒結束 (呼叫端持有 on_events 需要的鎖時使用)"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        with self._lock:
+            # 執行緒已自行結束 (例如讀取錯誤) 時 fd 已關閉
+            if not self._closed:
+                os.write(self._wake[1], b"x")
+        if wait and thread is not threading.current_thread():
+            thread.join()
+
+    def watch(self, dir_path):
+        """
+        開始監看資料夾；已在監看時直接回傳 True。
+        資料夾不存在或無法讀取時回傳 False，其他錯誤 (例如達到 max_user_watches 上限) 拋出 OSError。
+        """
+        with self._lock:
+            if dir_path in self._wds:
+                return True
+            if self._fd < 0:
+                return False
+            wd = _libc.inotify_add_watch(self._fd, os.fsencode(dir_path or os.curdir), self.MASK)
+            if wd < 0:
+                if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    return False
+                raise _os_error(dir_path)
+            self._wds[dir_path] = wd
+            # 同一個資料夾以不同路徑 (符號連結) 加入時 wd 相同，事件沿用第一個路徑
+            self._paths.setdefault(wd, dir_path)
+            return True
+
+    def unwatch(self, dir_path):
+        with self._lock:
+            wd = self._wds.pop(dir_path, None)
+            if wd is not None and self._paths.get(wd) == dir_path:
+                del self._paths[wd]
+                _libc.inotify_rm_watch(self._fd, wd)
+
+    def watched(self):
+        with self._lock:
+            return list(self._wds)
+
+    def _forget(self, wd, remove):
+        with self._lock:
+            dir_path = self._paths.pop(wd, None)
+            if dir_path is not None:
+                self._wds.pop(dir_path, None)
+                if remove:
+                    _libc.inotify_rm_watch(self._fd, wd)
+
+    def _read(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            raw = data[offset:offset + length].split(b"\0", 1)[0]
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append(("reset", None, "", 0))
+                continue
+            with self._lock:
+                dir_path = self._paths.get(wd)
+            if dir_path is None:
+                continue
+            if mask & IN_IGNORED:
+                self._forget(wd, remove=False)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # 資料夾移動後 wd 仍指向同一個 inode，之後的事件會對應到錯誤的路徑
+                self._forget(wd, remove=bool(mask & IN_MOVE_SELF))
+                events.append(("reset", dir_path, "", 0))
+                continue
+            for bit, kind in _KINDS:
+                if mask & bit:
+                    events.append((kind, dir_path, os.fsdecode(raw), cookie))
+                    break
+        return events
+
+    def _deliver(self, events):
+        try:
+            self.on_events(events)
+        except Exception as e:
+            print(f"Warning: 處理檔案變動事件失敗 ({e})", file=sys.stderr)
+
+    def _run(self):
+        wake_fd = self._wake[0]
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        poller.register(wake_fd, select.POLLIN)
+        pending = []
+        try:
+            while True:
+                # 有待處理的事件時只再等 BATCH_DELAY，把連續的變動合併成一批
+                ready = poller.poll(self.BATCH_DELAY * 1000 if pending else None)
+                if any(fd == wake_fd for fd, _ in ready):
+                    break
+                if ready:
+                    pending.extend(self._read())
+                if pending and (not ready or len(pending) >= self.MAX_BATCH):
+                    self._deliver(pending)
+                    pending = []
+        finally:
+            with self._lock:
+                os.close(self._fd)
+                self._fd = -1
+                self._paths.clear()
+                self._wds.clear()
+                os.close(self._wake[0])
+                os.close(self._wake[1])
+                self._closed = True
@@ -0,0 +1,235 @@
+import itertools
+import json
+import os
+import sys
+import time
+from array import array
+
+from app_paths import data_path
+from file_lock import FileLock
+from path_table import DIRS
+
+_NO_UID = -1 # 從磁碟載入的移動沒有 uid
+
+
+class RenameBatch:
+    """
+    一次批次重命名，依執行順序保存每個移動 (uid, 舊路徑, 新路徑)。
+    路徑以 (資料夾索引, 檔名) 保存，資料夾字串在 path_table.DIRS 中只有一份；
+    uid 與資料夾索引放在 array 中，每個移動只多佔兩個檔名字串。
+    從磁碟載入的批次 uid 為 None，且內容在第一次使用時才讀取。
+    """
+    __slots__ = ('id', '_uids', '_src_dirs', '_src_names', '_dst_dirs', '_dst_names', '_store', 'dirty')
+
+    def __init__(self, batch_id, ops=None, store=None):
+        self.id = batch_id
+        self._uids = None
+        self._store = store
+        self.dirty = ops is not None # 新建立的批次尚未寫入磁碟
+        if ops is not None:
+            self._pack(ops)
+
+    def _pack(self, ops):
+        split = DIRS.split
+        uids, src_dirs, dst_dirs = array('q'), array('l'), array('l')
+        src_names, dst_names = [], []
+        for uid, old, new in ops:
+            uids.append(_NO_UID if uid is None else uid)
+            d, n = split(old)
+            src_dirs.append(d)
+            src_names.append(n)
+            d, n = split(new)
+            dst_dirs.append(d)
+            dst_names.append(n)
+        self._uids, self._src_dirs, self._src_names = uids, src_dirs, src_names
+        self._dst_dirs, self._dst_names = dst_dirs, dst_names
+
+    def _load(self):
+        if self._uids is None:
+            self._pack(self._store.read_ops(self.id) if self._store else [])
+
+    @property
+    def loaded(self):
+        return self._uids is not None
+
+    def __len__(self):
+        self._load()
+        return len(self._uids)
+
+    def paths(self):
+        """依序產生 (舊路徑, 新路徑)"""
+        self._load()
+        join = DIRS.join
+        for sd, sn, dd, dn in zip(self._src_dirs, self._src_names, self._dst_dirs, self._dst_names):
+            yield join(sd, sn), join(dd, dn)
+
+    @property
+    def ops(self):
+        """展開成 [(uid, 舊路徑, 新路徑), ...]；每次存取都會重新組合"""
+        self._load()
+        return [
+            (None if uid == _NO_UID else uid, old, new)
+            for uid, (old, new) in zip(self._uids, self.paths())
+        ]
+
+    @ops.setter
+    def ops(self, ops):
+        self._pack(ops)
+        self.dirty = True
+
+    def discard(self, uids):
+        """
+        移除 uid 屬於 uids 的移動 (移除檔案時只記錄墓碑，到這裡才真正套用)。
+        尚未載入的批次來自之前的工作階段，不含本次的 uid，不需處理。
+        回傳: 移除的數量
+        """
+        if self._uids is None or not uids:
+            return 0
+        keep = [i for i, uid in enumerate(self._uids) if uid not in uids]
+        removed = len(self._uids) - len(keep)
+        if removed:
+            self._uids = array('q', [self._uids[i] for i in keep])
+            self._src_dirs = array('l', [self._src_dirs[i] for i in keep])
+            self._dst_dirs = array('l', [self._dst_dirs[i] for i in keep])
+            self._src_names = [self._src_names[i] for i in keep]
+            self._dst_names = [self._dst_names[i] for i in keep]
+            self.dirty = True
+        return removed
+
+
+class HistoryStore:
+    """
+    復原/重做紀錄的磁碟儲存：
+      history/<batch_id>.jsonl  每行一個 [舊路徑, 新路徑]
+      history/stacks.json       {"undo": [batch_id, ...], "redo": [...]}
+    批次內容只寫入一次，undo/redo 只需改寫很小的 stacks.json。
+    directory=False 時不寫入磁碟 (僅保存在記憶體)。
+
+    多個行程可能共用同一個資料夾：讀寫時持有 history/.lock，
+    儲存時保留其他行程加入的批次，也只刪除本行程讀取或寫入過的批次檔。
+    """
+    MAX_UNDO = 50
+    # 沒有被任何堆疊引用、且超過此秒數未修改的批次檔視為殘留 (寫入後、更新 stacks.json 前中斷)
+    ORPHAN_AGE = 86400
+
+    _seq = itertools.count(1)
+
+    def __init__(self, directory=None):
+        self.directory = data_path("history") if directory is None else directory
+        self._known = set() # 本行程讀取或寫入過的批次
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def new_batch_id(cls):
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(cls._seq)}"
+
+    def _batch_path(self, batch_id):
+        return os.path.join(self.directory, batch_id + ".jsonl")
+
+    def _stacks_path(self):
+        return os.path.join(self.directory, "stacks.json")
+
+    def _lock(self):
+        return FileLock(os.path.join(self.directory, ".lock"))
+
+    def _read_stacks(self):
+        try:
+            with open(self._stacks_path(), "r", encoding="utf-8") as f:
+                stacks = json.load(f)
+        except (OSError, ValueError):
+            return [], []
+        return stacks.get("undo", []), stacks.get("redo", [])
+
+    def read_ops(self, batch_id):
+        ops = []
+        try:
+            with open(self._batch_path(batch_id), "r", encoding="utf-8") as f:
+                for line in f:
+                    old, new = json.loads(line)
+                    ops.append((None, old, new))
+        except (OSError, ValueError) as e:
+            print(f"Warning: 無法讀取復原紀錄 {batch_id} ({e})", file=sys.stderr)
+        return ops
+
+    def load(self):
+        """回傳: (undo 批次列表, redo 批次列表)，批次內容延後讀取"""
+        if not self.directory:
+            return [], []
+        try:
+            with self._lock():
+                undo, redo = self._read_stacks()
+                self._remove_orphans(set(undo) | set(redo))
+        except OSError as e:
+            print(f"Warning: 無法讀取復原紀錄 ({e})", file=sys.stderr)
+            return [], []
+        self._known.update(undo, redo)
+        make = lambda ids: [RenameBatch(b, store=self) for b in ids if os.path.exists(self._batch_path(b))]
+        return make(undo), make(redo)
+
+    def save(self, history, redo_stack):
+        """
+        寫入有變動的批次與 stacks.json，並刪除不再被引用的批次檔。
+        超過 MAX_UNDO 的最舊批次會從 history 中移除。
+        """
+        if len(history) > self.MAX_UNDO:
+            del history[:len(history) - self.MAX_UNDO]
+        if not self.directory:
+            return
+        mine = {b.id for b in itertools.chain(history, redo_stack)}
+        self._known.update(mine)
+        try:
+            with self._lock():
+                for batch in itertools.chain(history, redo_stack):
+                    if batch.dirty:
+                        self._write_batch(batch)
+                # 保留其他行程加入、本行程不知道的批次；undo 依批次 id 開頭的時間排序 (同一秒內維持原順序)
+                undo, redo = self._read_stacks()
+                foreign = lambda ids: [b for b in ids if b not in self._known and os.path.exists(self._batch_path(b))]
+                merged = sorted(foreign(undo) + [b.id for b in history], key=lambda b: b[:15])
+                self._write_json(self._stacks_path(), {
+                    "undo": merged[-self.MAX_UNDO:],
+                    "redo": foreign(redo) + [b.id for b in redo_stack],
+                })
+                self._remove_unreferenced(self._known - mine)
+                self._known = mine
+        except OSError as e:
+            print(f"Warning: 無法儲存復原紀錄 ({e})", file=sys.stderr)
+
+    def _write_batch(self, batch):
+        path = self._batch_path(batch.id)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for old, new in batch.paths():
+                f.write(json.dumps([old, new], ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        batch.dirty = False
+
+    @staticmethod
+    def _write_json(path, data):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _remove_unreferenced(self, batch_ids):
+        """刪除本行程不再引用的批次檔 (其他行程的批次不受影響)"""
+        for batch_id in batch_ids:
+            try:
+                os.remove(self._batch_path(batch_id))
+            except OSError:
+                pass
+
+    def _remove_orphans(self, referenced):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".jsonl") or name[:-len(".jsonl")] in referenced:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.ORPHAN_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,80 @@
+import base64
+import io
+import os
+
+from PIL import Image, ImageOps
+
+MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+    'GIF': 'image/gif',
+}
+
+JPEG_QUALITIES = (85, 75, 65, 50)
+# 品質降到最低仍超過預算時，每次再把長邊縮小的比例
+SHRINK_FACTOR = 0.75
+MIN_EDGE = 256
+
+
+def _b64_size(n_bytes):
+    return (n_bytes + 2) // 3 * 4
+
+
+def _has_alpha(img):
+    return img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+
+
+def _encode(img, fmt, **params):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **params)
+    return buf.getvalue()
+
+
+def prepare_image(image_path, max_edge=1568, max_bytes=2 * 1024 * 1024):
+    """
+    將圖片轉為可上傳的 (mime, base64 字串)。
+    - 已符合尺寸與預算、且不需轉向的 JPEG/PNG/WEBP/GIF 直接送原檔
+    - 否則延遲解碼 (JPEG 以 draft 在解碼時即縮小) 並縮至長邊 max_edge 後重新編碼
+    - max_bytes 為 base64 後的大小上限，無法壓到預算內時拋出 ValueError
+    """
+    file_size = os.path.getsize(image_path)
+
+    with Image.open(image_path) as img:
+        fmt = img.format
+        orientation = img.getexif().get(0x0112, 1)
+
+        if (fmt in MIME_TYPES and max(img.size) <= max_edge
+                and orientation == 1 and _b64_size(file_size) <= max_bytes):
+            with open(image_path, "rb") as f:
+                return MIME_TYPES[fmt], base64.b64encode(f.read()).decode('utf-8')
+
+        if fmt == 'JPEG':
+            img.draft('RGB', (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+
+        keep_alpha = _has_alpha(img)
+        img = img.convert('RGBA' if keep_alpha else 'RGB')
+
+        edge = max_edge
+        while True:
+            frame = img.copy()
+            frame.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+
+            if keep_alpha:
+                data = _encode(frame, 'PNG', optimize=True)
+                if _b64_size(len(data)) <= max_bytes:
+                    return 'image/png', base64.b64encode(data).decode('utf-8')
+                # 透明 PNG 太大時改以白底 JPEG 送出
+                background = Image.new('RGB', frame.size, (255, 255, 255))
+                background.paste(frame, mask=frame.getchannel('A'))
+                frame = background
+
+            for quality in JPEG_QUALITIES:
+                data = _encode(frame, 'JPEG', quality=quality, optimize=True)
+                if _b64_size(len(data)) <= max_bytes:
+                    return 'image/jpeg', base64.b64encode(data).decode('utf-8')
+
+            if edge <= MIN_EDGE:
+                raise ValueError(f"圖片壓縮後仍超過 {max_bytes / 1024 / 1024:.1f} MB 上限")
+            edge = max(MIN_EDGE, int(edge * SHRINK_FACTOR))
@@ -1,214 +1,519 @@
-import re
 import os
-import uuid
+import stat
+import sys
+import threading
+from functools import wraps
+
+from dir_cache import DirectoryCache
+from file_table import FileTable
+from history_store import HistoryStore, RenameBatch
+from path_table import DIRS
+from preview_engine import PreviewEngine
+from rename_journal import RenameJournal
+from rename_planner import plan_renames, flatten, collapse_steps
+from rename_executor import RenameExecutor
+import tracing
+
+def synchronized(method):
+    """預覽可能在背景執行緒計算，所有讀寫檔案表的操作都需持有 manager.lock"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class RenameManager:
     def __init__(self):
-        self.files = []
-        self.history = []
-        self.redo_stack = []
+        self.lock = threading.RLock()
+        self.files = FileTable()
+        self.dir_cache = DirectoryCache()
+        self.preview = PreviewEngine(self.files, self.dir_cache)
+        self.history_store = HistoryStore()
+        self.history, self.redo_stack = self.history_store.load()
+        # 已移除檔案的 id；延到下次復原/重做/儲存歷史時才從批次中剔除
+        self.tombstones = set()
+        self.journal = RenameJournal()
+        self.executor = RenameExecutor()
+        self.last_report = None # 最近一次執行的 ExecutionReport
+        # 上次中斷的批次 (JournalState)，處理前不允許新的重命名
+        self.interrupted = self.journal.load()
+        if self.interrupted is None:
+            self.journal.discard()
+        # fs_watcher.DirectoryWatcher (start_watching 後)；監看中 validate_files 不再逐檔檢查
+        self.watcher = None
+        self._watched_dirs = set() # 已加入監看的資料夾索引
+        self._unwatched_dirs = set() # 無法監看 (不存在、無權限) 的資料夾索引，維持輪詢
+        self._watch_stale = False # 事件可能不完整 (新加入監看、佇列溢位)，下次需要完整檢查
+        self._on_fs_change = None
 
+    @synchronized
     def set_files(self, file_paths):
-        self.files = []
-        for f in file_paths:
-            if os.path.exists(f):
-                self.files.append({
-                    'id': str(uuid.uuid4()),
-                    'path': f,
-                    'is_dir': os.path.isdir(f),
-                    'override_name': None
-                })
-        self.files.sort(key=lambda x: x['path'])
+        self.files.clear()
+        self.add_files(file_paths)
 
+    @synchronized
     def add_files(self, file_paths):
-        existing_paths = {f['path'] for f in self.files}
+        # 依資料夾分組，以資料夾快照判斷存在與否及是否為資料夾 (可分批呼叫，不會重複掃描)
+        by_dir = {}
         for f in file_paths:
-            if os.path.exists(f) and f not in existing_paths:
-                self.files.append({
-                    'id': str(uuid.uuid4()),
-                    'path': f,
-                    'is_dir': os.path.isdir(f),
-                    'override_name': None
-                })
-        self.files.sort(key=lambda x: x['path'])
+            f = os.path.normpath(f)
+            if f in self.files:
+                continue
+            dir_name, name = os.path.split(f)
+            by_dir.setdefault(dir_name, []).append((f, name))
 
+        entries = []
+        for dir_name, items in by_dir.items():
+            snap = self.dir_cache.snapshot(dir_name)
+            for f, name in items:
+                actual = snap.lookup(name) if name else None
+                if actual is not None:
+                    # 不分大小寫的檔案系統上以磁碟上的實際檔名加入
+                    if actual != name:
+                        f = os.path.join(dir_name, actual)
+                    entries.append((f, snap.entries[actual]))
+                    continue
+                # 快照之後才出現的檔案 (或磁碟根目錄等無檔名的路徑)，退回 os.stat
+                try:
+                    st = os.stat(f)
+                except OSError:
+                    continue
+                is_dir = stat.S_ISDIR(st.st_mode)
+                if name:
+                    snap.add(name, is_dir)
+                entries.append((f, is_dir))
+        self._watch_records(self.files.extend(entries))
+
+    @synchronized
+    def add_entries(self, entries):
+        """
+        加入已確認存在的 (path, is_dir)，例如 file_walker 走訪的結果，不再逐一檢查。
+        回傳: 新增的數量
+        """
+        added = self.files.extend(entries)
+        self._watch_records(added)
+        return len(added)
+
+    @synchronized
     def set_file_override(self, uid, new_name):
         """設定特定檔案的強制命名 (用於 AI 重命名)"""
-        for f in self.files:
-            if f['id'] == uid:
-                f['override_name'] = new_name
-                break
+        rec = self.files.get(uid)
+        if rec:
+            self.files.set_override(rec, new_name)
 
+    @synchronized
     def remove_file_by_id(self, target_id):
-        self.files = [f for f in self.files if f['id'] != target_id]
-        def filter_batch(batch):
-            return [op for op in batch if op['id'] != target_id]
-        self.history = [filter_batch(batch) for batch in self.history]
-        self.history = [b for b in self.history if b]
-        self.redo_stack = [filter_batch(batch) for batch in self.redo_stack]
-        self.redo_stack = [b for b in self.redo_stack if b]
-
-    def validate_files(self):
-        missing_ids = [x['id'] for x in self.files if not os.path.exists(x['path'])]
+        # 歷史紀錄只記下墓碑，不必每移除一個檔案就掃過所有批次
+        if self.files.remove(target_id) is not None:
+            self.tombstones.add(target_id)
+
+    def _apply_tombstones(self):
+        """將墓碑套用到歷史紀錄：剔除已移除檔案的移動，並丟棄因此變空的批次"""
+        if not self.tombstones:
+            return
+        dead = self.tombstones
+        for batch in self.history + self.redo_stack:
+            batch.discard(dead)
+        self.history = [b for b in self.history if not b.loaded or len(b)]
+        self.redo_stack = [b for b in self.redo_stack if not b.loaded or len(b)]
+        self.tombstones = set()
+
+    @synchronized
+    def validate_files(self, refresh=False):
+        """
+        以資料夾快照檢查檔案是否仍存在 (每個資料夾一次 os.scandir)。
+        refresh=True 時強制重新掃描，否則沿用未過期的快照；監看中且事件完整時直接略過。
+        """
+        if refresh:
+            self.dir_cache.invalidate()
+        elif self.watcher is not None and not self._watch_stale and not self._unwatched_dirs:
+            # 外部變動已由 apply_fs_events 套用
+            return len(self.files), 0
+        if self.watcher is not None:
+            # 重新監看失效 (reset) 或先前無法監看的資料夾
+            self._unwatched_dirs = set()
+            self._watch_records(self.files)
+        self._watch_stale = False
+        missing_ids = []
+        present = set() # 仍有檔案的資料夾索引
+        snapshot = self.dir_cache.snapshot
+        snaps = {} # 資料夾索引 -> 快照
+        for x in self.files:
+            snap = snaps.get(x.dir)
+            if snap is None:
+                snap = snaps[x.dir] = snapshot(x.dir_path)
+            if x.name and x.name not in snap:
+                missing_ids.append(x.id)
+            else:
+                present.add(x.dir)
+        self._unwatched_dirs &= present
         if missing_ids:
-            for mid in missing_ids:
-                self.remove_file_by_id(mid)
+            self.files.remove_many(missing_ids)
+            self.tombstones.update(missing_ids)
             return len(self.files), len(missing_ids)
         return len(self.files), 0
 
-    def _convert_repl_format(self, repl_str):
-        if not repl_str: return ""
-        temp_marker = "___ESCAPED_DOLLAR___"
-        s = repl_str.replace(r'\$', temp_marker)
-        s = re.sub(r'\$(\d+)', r'\\\1', s)
-        s = s.replace(temp_marker, '$')
-        return s
-
-    def get_preview(self, pattern, repl):
-        self.validate_files()
-        previews = []
-        has_conflict = False
-        
-        regex = None
-        clean_repl = ""
-        regex_error = None
-        
-        if pattern:
-            clean_repl = self._convert_repl_format(repl)
+    def start_watching(self, on_change=None):
+        """
+        (Linux) 以 inotify 監看檔案所在的資料夾，外部的新增、刪除與改名直接套用到檔案表，
+        預覽前不再逐檔檢查。之後加入的檔案所在的資料夾也會自動監看。
+        on_change: 事件造成變動時呼叫 (在監看執行緒中)
+        回傳: 是否已啟用；不支援的平台回傳 False，維持輪詢
+        """
+        with self.lock:
+            self._on_fs_change = on_change
+            if self.watcher is not None:
+                return True
+            import fs_watcher
+            if not fs_watcher.available():
+                return False
+            watcher = fs_watcher.DirectoryWatcher(self.apply_fs_events)
             try:
-                regex = re.compile(pattern)
-            except re.error as e:
-                regex_error = f"RegEx 錯誤: {e}"
-
-        seen_full_paths = set()
-
-        for item in self.files:
-            file_path = item['path']
-            dir_name = os.path.dirname(file_path)
-            old_name = os.path.basename(file_path)
-            
-            new_name = old_name # 預設不變
-
-            # 邏輯判斷：優先權 Override > RegEx
-            if item['override_name']:
-                new_name = item['override_name']
-            elif regex:
-                try:
-                    new_name = regex.sub(clean_repl, old_name)
-                except re.error:
-                    pass
-            
-            # 如果有 RegEx 錯誤且沒有 Override，回報錯誤
-            if regex_error and not item['override_name']:
-                return [], regex_error, False
-
-            new_full_path = os.path.join(dir_name, new_name)
-            status = "ok"
-            
-            if os.path.exists(new_full_path) and new_name != old_name:
-                 status = "conflict"
-                 has_conflict = True
-            
-            if new_full_path in seen_full_paths:
-                status = "duplicate"
-                has_conflict = True
-            
-            seen_full_paths.add(new_full_path)
-            
-            previews.append({
-                'id': item['id'],
-                'original': old_name, 
-                'new': new_name, 
-                'full_old': file_path,
-                'full_new': new_full_path,
-                'status': status,
-                'is_dir': item['is_dir'],
-                'is_overridden': bool(item['override_name']) # 讓 UI 知道這是 AI 命名的
-            })
-
-        return previews, None, has_conflict
+                watcher.start()
+            except OSError as e:
+                print(f"Warning: 無法啟用檔案監看 ({e})", file=sys.stderr)
+                return False
+            self.watcher = watcher
+            self._watched_dirs = set()
+            self._watch_records(self.files)
+            return self.watcher is not None
+
+    def stop_watching(self, wait=True):
+        """
+        wait=False 時不等待監看執行緒結束 (例如在 UI 執行緒呼叫，執行緒可能正在執行 on_change)；
+        之後送達的事件會因 self.watcher 已清除而被忽略。
+        """
+        # 不可持有 self.lock 等待監看執行緒：它可能正等著 self.lock 套用事件
+        with self.lock:
+            watcher, self.watcher = self.watcher, None
+            self._reset_watch_state()
+        if watcher is not None:
+            watcher.stop(wait=wait)
+
+    def _reset_watch_state(self):
+        self._watched_dirs = set()
+        self._unwatched_dirs = set()
+        self._on_fs_change = None
+        self.dir_cache.watched.clear()
+
+    def _watch_records(self, records):
+        """監看 records 所在但尚未監看的資料夾；無法監看的記入 _unwatched_dirs，預覽前照常輪詢檢查"""
+        if self.watcher is None:
+            return
+        new_dirs = {rec.dir for rec in records} - self._watched_dirs - self._unwatched_dirs
+        for dir_index in new_dirs:
+            dir_path = DIRS.path(dir_index)
+            try:
+                watching = self.watcher.watch(dir_path)
+            except OSError as e:
+                print(f"Warning: 無法監看資料夾，改回輪詢檢查 ({e})", file=sys.stderr)
+                self.watcher.stop(wait=False)
+                self.watcher = None
+                self._reset_watch_state()
+                return
+            if watching:
+                self._watched_dirs.add(dir_index)
+                # 開始監看前的變動不會有事件，重新掃描一次
+                self.dir_cache.watched.add(dir_path)
+                self.dir_cache.refresh(dir_path)
+            else:
+                self._unwatched_dirs.add(dir_index)
+        if new_dirs:
+            self._watch_stale = True
+
+    def apply_fs_events(self, events):
+        """
+        套用 fs_watcher 的事件 (由監看執行緒呼叫)。事件只當作提示，實際狀態以 lstat 為準：
+        - 成對的 moved_from / moved_to，舊路徑已不存在且新路徑存在時，紀錄跟著改名
+        - 其他受影響的名稱依 lstat 更新資料夾快照，已不存在的紀錄從檔案表移除
+        - reset: 事件不完整，丟棄該資料夾的快照並在下次預覽前完整檢查 (同時重新監看)
+        本程式自己的重命名也會產生事件，此時快照與檔案表都已更新，不會有變動。
+        on_change 在釋放 self.lock 之後才呼叫，回呼中可以再使用 manager。
+        回傳: 是否有任何變動
+        """
+        changed, on_change = self._apply_fs_events(events)
+        if changed and on_change:
+            on_change()
+        return changed
+
+    @synchronized
+    def _apply_fs_events(self, events):
+        """回傳: (是否有變動, 當時的 on_change 回呼)"""
+        if self.watcher is None:
+            return False, None
+        from fs_watcher import entry_type
+        state = (self.files.version, self.dir_cache.version)
+        touched = {} # (資料夾, 檔名)，保持事件順序
+        moves = []
+        moved_from = {}
+        reset = False
+        for kind, dir_path, name, cookie in events:
+            if kind == "reset":
+                reset = True
+                self.dir_cache.invalidate(dir_path)
+                if dir_path is not None:
+                    # 資料夾本身已移動或刪除，監看已失效
+                    self.dir_cache.watched.discard(dir_path)
+                    self._watched_dirs.discard(DIRS.find(dir_path))
+                continue
+            touched[(dir_path, name)] = None
+            if kind == "moved_from":
+                moved_from[cookie] = os.path.join(dir_path, name)
+            elif kind == "moved_to" and cookie in moved_from:
+                moves.append((moved_from.pop(cookie), os.path.join(dir_path, name)))
+
+        for old, new in moves:
+            rec = self.files.find_path(old)
+            if (rec is not None and new not in self.files
+                    and entry_type(old) is None and entry_type(new) is not None):
+                self.files.relocate(rec, new)
+
+        gone = []
+        for dir_path, name in touched:
+            full = os.path.join(dir_path, name)
+            is_dir = entry_type(full)
+            self.dir_cache.note_entry(dir_path, name, is_dir)
+            if is_dir is None:
+                rec = self.files.find_path(full)
+                if rec is not None:
+                    gone.append(rec.id)
+        if gone:
+            self.files.remove_many(gone)
+            self.tombstones.update(gone)
+        if reset:
+            self._watch_stale = True
+
+        tracing.count("fs.events", len(events))
+        changed = reset or state != (self.files.version, self.dir_cache.version)
+        return changed, self._on_fs_change
 
+    @synchronized
+    def get_preview(self, pattern, repl, should_cancel=None):
+        """should_cancel: 可選的回呼，回傳 True 時中止計算並拋出 PreviewCancelled"""
+        with tracing.span("preview", rows=len(self.files)) as sp:
+            self.validate_files()
+            result = self.preview.compute(pattern, repl, should_cancel)
+            sp.set(conflict=result[2])
+        return result
+
+    @synchronized
     def execute_rename(self, previews):
-        batch_history = []
+        if self.interrupted is not None:
+            return False, "有未完成的重命名批次，請先繼續或復原"
+        ops = [
+            (item.id, item.full_old, item.full_new)
+            for item in previews
+            if item.original != item.new and item.status == 'ok'
+        ]
+        if not ops:
+            return True, "成功重命名 0 個檔案"
+        ops, skipped = self._drop_occupied(ops)
+        if not ops:
+            return False, f"目標檔名已被其他檔案使用，未重命名 ({skipped} 個)"
+
+        batch_id = HistoryStore.new_batch_id()
         try:
-            for item in previews:
-                if item['original'] != item['new'] and item['status'] == 'ok':
-                    os.rename(item['full_old'], item['full_new'])
-                    
-                    batch_history.append({
-                        'id': item['id'],
-                        'new_path': item['full_new'],
-                        'old_path': item['full_old']
-                    })
-                    
-                    for f in self.files:
-                        if f['id'] == item['id']:
-                            f['path'] = item['full_new']
-                            f['override_name'] = None 
-                            break
-            
-            if batch_history:
-                self.history.append(batch_history)
-                self.redo_stack.clear()
-                self.files.sort(key=lambda x: x['path'])
-                
-            return True, f"成功重命名 {len(batch_history)} 個檔案"
+            done, error = self._run_plan(batch_id, "rename", [(old, new) for _, old, new in ops])
         except Exception as e:
-            self.validate_files()
             return False, f"執行失敗: {e}"
 
+        done_ops = [ops[i] for i in sorted(done)]
+        for uid, _, new in done_ops:
+            rec = self.files.get(uid)
+            if rec:
+                self.files.relocate(rec, new)
+                self.files.set_override(rec, None)
+
+        # 中途失敗時已完成的部分仍記入歷史，可以復原
+        if done_ops:
+            self.history.append(RenameBatch(batch_id, done_ops))
+            self.redo_stack.clear()
+        self._commit_history()
+
+        if error:
+            self.validate_files(refresh=True)
+            return False, f"執行失敗: {error}"
+        if skipped:
+            return True, f"成功重命名 {len(done_ops)} 個檔案，略過 {skipped} 個目標已存在的檔案"
+        return True, f"成功重命名 {len(done_ops)} 個檔案"
+
+    def _drop_occupied(self, ops):
+        """
+        預覽用的資料夾快照可能已過期：執行前重新掃描目標資料夾，
+        移除目標已被其他檔案佔用的項目 (佔用者本身也在這批中移走則不算)。
+        回傳: (保留的 ops, 移除的數量)
+        """
+        path_key = self.dir_cache.path_key
+        for dir_name in {os.path.dirname(new) for _, _, new in ops}:
+            self.dir_cache.refresh(dir_name)
+        kept = ops
+        while True:
+            sources = {path_key(old) for _, old, _ in kept}
+            remaining = []
+            for op in kept:
+                dir_name, new_name = os.path.split(op[2])
+                occupant = self.dir_cache.snapshot(dir_name).lookup(new_name)
+                if occupant is None or path_key(os.path.join(dir_name, occupant)) in sources:
+                    remaining.append(op)
+            if len(remaining) == len(kept):
+                return kept, len(ops) - len(kept)
+            kept = remaining
+
+    @synchronized
     def undo(self):
+        self._apply_tombstones()
         if not self.history: return False, "無可復原的操作"
-        last_batch = self.history.pop()
-        redo_batch = []
+        if self.interrupted is not None:
+            return False, "有未完成的重命名批次，請先繼續或復原"
+        batch = self.history.pop()
         try:
-            for op in last_batch:
-                if os.path.exists(op['new_path']):
-                    os.rename(op['new_path'], op['old_path'])
-                    redo_batch.append({
-                        'id': op['id'],
-                        'new_path': op['old_path'],
-                        'old_path': op['new_path']
-                    })
-                    for f in self.files:
-                        if f['id'] == op['id']:
-                            f['path'] = op['old_path']
-                            break
-            if redo_batch:
-                self.redo_stack.append(redo_batch)
-                self.files.sort(key=lambda x: x['path'])
-                return True, "已復原"
-            else:
-                return False, "部分檔案已遺失"
+            done, left, error = self._replay(batch, undo=True)
         except Exception as e:
-            self.validate_files()
+            self.history.append(batch)
             return False, f"復原失敗: {e}"
 
+        if left:
+            self.history.append(RenameBatch(HistoryStore.new_batch_id(), left))
+        if done:
+            if len(done) != len(batch):
+                batch.ops = done
+            self.redo_stack.append(batch)
+        self._commit_history()
+
+        if error:
+            self.validate_files(refresh=True)
+            return False, f"復原失敗: {error}"
+        return (True, "已復原") if done else (False, "部分檔案已遺失")
+
+    @synchronized
     def redo(self):
+        self._apply_tombstones()
         if not self.redo_stack: return False, "無可重做的操作"
-        last_redo_batch = self.redo_stack.pop()
-        history_batch = []
+        if self.interrupted is not None:
+            return False, "有未完成的重命名批次，請先繼續或復原"
+        batch = self.redo_stack.pop()
         try:
-            for op in last_redo_batch:
-                src = op['new_path']
-                dst = op['old_path']
-                if os.path.exists(src):
-                    os.rename(src, dst)
-                    history_batch.append({
-                        'id': op['id'],
-                        'new_path': dst,
-                        'old_path': src
-                    })
-                    for f in self.files:
-                        if f['id'] == op['id']:
-                            f['path'] = dst
-                            break
-            if history_batch:
-                self.history.append(history_batch)
-                self.files.sort(key=lambda x: x['path'])
-                return True, "已重做"
-            else:
-                return False, "無法重做"
+            done, left, error = self._replay(batch, undo=False)
         except Exception as e:
-            self.validate_files()
-            return False, f"重做失敗: {e}"
\ No newline at end of file
+            self.redo_stack.append(batch)
+            return False, f"重做失敗: {e}"
+
+        if left:
+            self.redo_stack.append(RenameBatch(HistoryStore.new_batch_id(), left))
+        if done:
+            if len(done) != len(batch):
+                batch.ops = done
+            self.history.append(batch)
+        self._commit_history()
+
+        if error:
+            self.validate_files(refresh=True)
+            return False, f"重做失敗: {error}"
+        return (True, "已重做") if done else (False, "無法重做")
+
+    def _replay(self, batch, undo):
+        """
+        復原 (新→舊) 或重做 (舊→新) 一個批次；檔案已不存在的項目會被略過。
+        回傳: (已完成的 ops, 因錯誤未執行的 ops, 例外或 None)
+        """
+        todo = [op for op in batch.ops if os.path.exists(op[2] if undo else op[1])]
+        moves = [(new, old) if undo else (old, new) for _, old, new in todo]
+        done, error = self._run_plan(batch.id, "undo" if undo else "redo", moves)
+        self._relocate_moves([moves[i] for i in done])
+        return [op for i, op in enumerate(todo) if i in done], [op for i, op in enumerate(todo) if i not in done], error
+
+    def _run_plan(self, batch_id, kind, moves):
+        """
+        以 rename_planner 排定順序 (鏈由尾端開始、環經由暫存名稱) 後執行。
+        回傳: (已完成的移動編號集合, 例外或 None)；呼叫端記錄歷史後需呼叫 _commit_history
+        """
+        return self._run_groups(batch_id, kind, plan_renames(moves, key=self.dir_cache.path_key))
+
+    def _run_groups(self, batch_id, kind, groups):
+        """
+        先將計畫寫入日誌，再交給 RenameExecutor 平行執行。
+        groups: [[(來源, 目標, 移動編號), ...], ...]，移動編號為 None 表示環的暫存步驟
+        """
+        steps = flatten(groups)
+        with tracing.span("rename.execute" if kind == "rename" else "rename." + kind, steps=len(steps)) as sp:
+            self.journal.begin(batch_id, kind, [(src, dst) for src, dst, _ in steps])
+            done, applied, error, self.last_report = self.executor.run(groups, self.journal.done)
+            for i in applied:
+                self.dir_cache.note_rename(steps[i][0], steps[i][1])
+            sp.set(applied=len(applied), workers=self.last_report.workers)
+            if error:
+                sp.set(failed=repr(error))
+        tracing.count("rename.steps", len(applied))
+        if error:
+            tracing.count("rename.failures")
+        return done, error
+
+    def _relocate_moves(self, moves):
+        # 先找出所有紀錄再更新，互換名稱時才不會找到已被改過路徑的紀錄
+        found = [(self.files.find_path(src), dst) for src, dst in moves]
+        for rec, dst in found:
+            if rec:
+                self.files.relocate(rec, dst)
+
+    def _commit_history(self):
+        """歷史紀錄寫入磁碟後才結束日誌，確保中斷時至少有一方記錄了這個批次"""
+        self._apply_tombstones()
+        with tracing.span("rename.history_save"):
+            self.history_store.save(self.history, self.redo_stack)
+            self.journal.commit()
+
+    @synchronized
+    def recover(self, resume):
+        """
+        處理上次中斷的批次。
+        resume=True: 完成剩下的步驟；False: 將已完成的步驟改回原名
+        """
+        state = self.interrupted
+        if state is None:
+            return False, "沒有未完成的批次"
+        state.resolve()
+
+        if resume:
+            steps = state.remaining_steps()
+            # 先更新歷史再執行；恢復過程再次中斷時，日誌只描述恢復本身 (kind = recover)
+            self._record_recovered(state)
+        else:
+            steps = [(new, old) for old, new in reversed(state.applied_steps())]
+
+        self.interrupted = None
+        try:
+            # 恢復時依日誌原順序逐一執行 (單一群組)
+            done, error = self._run_groups(state.batch_id, "recover", [[(src, dst, i) for i, (src, dst) in enumerate(steps)]] if steps else [])
+        except Exception as e:
+            return False, f"恢復失敗: {e}"
+        self._relocate_moves(collapse_steps([steps[i] for i in sorted(done)]))
+        self._commit_history()
+
+        if error:
+            self.validate_files(refresh=True)
+            return False, f"恢復失敗: {error}"
+        if resume:
+            return True, f"已完成中斷的批次 ({len(done)} 個步驟)"
+        return True, f"已復原中斷的批次 ({len(done)} 個步驟)"
+
+    def _record_recovered(self, state):
+        """依中斷批次的種類更新 undo/redo 堆疊，如同該批次正常完成"""
+        def take(stack):
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i].id == state.batch_id:
+                    return stack.pop(i)
+            return None
+
+        if state.kind == "rename":
+            if not any(b.id == state.batch_id for b in self.history):
+                ops = [(None, old, new) for old, new in collapse_steps(state.steps)]
+                self.history.append(RenameBatch(state.batch_id, ops))
+                self.redo_stack.clear()
+        elif state.kind == "undo":
+            batch = take(self.history)
+            if batch:
+                self.redo_stack.append(batch)
+        elif state.kind == "redo":
+            batch = take(self.redo_stack)
+            if batch:
+                self.history.append(batch)
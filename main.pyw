@@ -1,8 +1,17 @@
+import time
+_STARTED = time.perf_counter()
+
+import json
+import multiprocessing
+import os
+import sys
 import customtkinter as ctk
 from tkinterdnd2 import TkinterDnD
 from logic import RenameManager
 from ui_dnd import DragDropWindow
-from ui_renamer import RenamerWindow
+from file_walker import start_ingest
+# 編輯介面 (ui_renamer) 在第一次拖入檔案時才載入；AI 與文件解析套件則在第一次使用時才載入
+_IMPORTED = time.perf_counter()
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -16,21 +25,65 @@ class MainApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.geometry("900x600")
         
         self.manager = RenameManager()
+        self.ingests = {} # 背景讀取中的資料夾: 取消旗標 -> 已加入數量
         
         self.frame_dnd = DragDropWindow(self, self.on_files_dropped)
         self.frame_renamer = None 
         
         self.frame_dnd.pack(fill="both", expand=True)
 
-    def on_files_dropped(self, files):
-        if not self.manager.files:
+        if self.manager.interrupted is not None:
+            self.after(200, self.check_interrupted_batch)
+
+    def check_interrupted_batch(self):
+        """上次重命名中途中斷 (當機、斷電)：詢問要繼續完成或改回原名"""
+        from ui_renamer import ask_recover
+        ask_recover(self.manager)
+        if self.frame_renamer:
+            self.frame_renamer.update_buttons_state()
+
+    def on_files_dropped(self, files, walk_options=None):
+        folders = []
+        if walk_options is not None:
+            folders = [f for f in files if os.path.isdir(f)]
+            files = [f for f in files if f not in folders]
+
+        if not self.manager.files and not self.ingests:
             self.manager.set_files(files)
         else:
             self.manager.add_files(files)
             
         self.switch_to_renamer()
 
+        if folders:
+            self.start_folder_ingest(folders, walk_options)
+
+    def start_folder_ingest(self, folders, walk_options):
+        """在背景走訪資料夾，分批加入檔案表，列表會隨讀取進度逐步顯示"""
+        def on_progress(count):
+            self.after(0, lambda: self.on_ingest_progress(cancel, count, False))
+
+        def on_done(count, cancelled):
+            self.after(0, lambda: self.on_ingest_progress(cancel, count, True))
+
+        cancel = start_ingest(self.manager, folders, walk_options, on_progress, on_done)
+        self.on_ingest_progress(cancel, 0, False)
+
+    def on_ingest_progress(self, cancel, count, done):
+        if done:
+            self.ingests.pop(cancel, None)
+        else:
+            self.ingests[cancel] = count
+        if self.frame_renamer:
+            self.frame_renamer.on_ingest_progress(sum(self.ingests.values()), not self.ingests)
+
+    def destroy(self):
+        for cancel in self.ingests:
+            cancel.set()
+        super().destroy()
+
     def switch_to_renamer(self):
+        from ui_renamer import RenamerWindow
         self.frame_dnd.pack_forget()
         
         if self.frame_renamer:
@@ -38,6 +91,8 @@ class MainApp(ctk.CTk, TkinterDnD.DnDWrapper):
             
         self.frame_renamer = RenamerWindow(self, self.manager, self.switch_to_dnd)
         self.frame_renamer.pack(fill="both", expand=True)
+        if self.ingests:
+            self.frame_renamer.on_ingest_progress(sum(self.ingests.values()), False)
 
     def switch_to_dnd(self):
         if self.frame_renamer:
@@ -45,5 +100,17 @@ class MainApp(ctk.CTk, TkinterDnD.DnDWrapper):
         self.frame_dnd.pack(fill="both", expand=True)
 
 if __name__ == "__main__":
+    # AI 批次的行程池在打包後的執行檔中需要此呼叫
+    multiprocessing.freeze_support()
     app = MainApp()
-    app.mainloop()
\ No newline at end of file
+    if "--startup-probe" in sys.argv[1:]:
+        # 供 startup_report.py 量測：視窗第一次繪製完成後輸出耗時並結束
+        app.update()
+        print(json.dumps({
+            "imports": _IMPORTED - _STARTED,
+            "window_shown": time.perf_counter() - _STARTED,
+            "modules": len(sys.modules),
+        }), flush=True)
+        app.destroy()
+    else:
+        app.mainloop()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import threading
+
+
+def split_path(full_path):
+    """
+    同 os.path.split，一般路徑 (只有一個分隔符號、不在開頭) 直接 rpartition，
+    根目錄、重複斜線、磁碟代號等特殊情況才交給 os.path.split。
+    """
+    head, _, name = full_path.rpartition(os.sep)
+    if not head or head.endswith((os.sep, ":")) or (os.altsep and os.altsep in name):
+        return os.path.split(full_path)
+    return head, name
+
+
+class DirectoryTable:
+    """
+    資料夾路徑的共用表 (interning)：每個資料夾字串只保存一份，其他結構以整數索引引用。
+    大量檔案通常集中在少數資料夾，(索引, 檔名) 比完整路徑省下重複的前綴。
+    只增不減；資料夾數量遠少於檔案數，長時間執行也不會明顯成長。
+    """
+    def __init__(self):
+        self._index = {}
+        self._paths = []
+        self._prefixes = [] # 資料夾 + 分隔符號，組合完整路徑時直接相加
+        self._last = ("\0", 0) # 最近一次拆解的 (前綴, 索引)；同一資料夾的連續路徑不必再拆解
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._paths)
+
+    def intern(self, dir_path):
+        index = self._index.get(dir_path)
+        if index is None:
+            with self._lock:
+                index = self._index.get(dir_path)
+                if index is None:
+                    index = len(self._paths)
+                    self._paths.append(dir_path)
+                    self._prefixes.append(os.path.join(dir_path, ""))
+                    self._index[dir_path] = index
+        return index
+
+    def find(self, dir_path):
+        """只查詢不新增；不在表中時回傳 None"""
+        return self._index.get(dir_path)
+
+    def lookup(self, full_path):
+        """完整路徑 -> (資料夾索引或 None, 檔名)，不新增資料夾"""
+        dir_path, name = split_path(full_path)
+        return self._index.get(dir_path), name
+
+    def path(self, index):
+        return self._paths[index]
+
+    def split(self, full_path):
+        """完整路徑 -> (資料夾索引, 檔名)"""
+        prefix, index = self._last
+        if full_path.startswith(prefix):
+            name = full_path[len(prefix):]
+            if name and os.sep not in name and not (os.altsep and os.altsep in name):
+                return index, name
+        dir_path, name = split_path(full_path)
+        index = self.intern(dir_path)
+        self._last = (self._prefixes[index], index)
+        return index, name
+
+    def join(self, index, name):
+        return self._prefixes[index] + name
+
+
+# 整個程式共用一張表，讓不同結構中的同一個資料夾都對應到同一個索引
+DIRS = DirectoryTable()
@@ -0,0 +1,366 @@
+import itertools
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+from path_table import DIRS
+import tracing
+
+# 每處理這麼多列檢查一次是否已被新的請求取代
+CANCEL_CHECK_INTERVAL = 4096
+# 需要重新套用 RegEx 的檔名超過此數時，分塊交給行程池
+PARALLEL_THRESHOLD = 200000
+PARALLEL_CHUNK = 50000
+# 保留最近幾組 (pattern, repl) 的逐檔結果，刪字 (backspace) 回到先前的輸入時不需重算
+MEMO_PATTERNS = 4
+# 完整預覽結果只保留最近兩組
+RESULT_MEMO = 2
+
+_TEMPLATE_TOKEN = re.compile(r'\\(?:g<([^>]*)>|([1-9][0-9]?)(?![0-9])|(.))|([^\\]+)', re.S)
+
+
+class PreviewCancelled(Exception):
+    """預覽計算被較新的請求取代"""
+    pass
+
+
+def convert_repl_format(repl_str):
+    """將 $1 / \\$ 形式的替換字串轉為 Python re 語法"""
+    if not repl_str: return ""
+    temp_marker = "___ESCAPED_DOLLAR___"
+    s = repl_str.replace(r'\$', temp_marker)
+    s = re.sub(r'\$(\d+)', r'\\\1', s)
+    s = s.replace(temp_marker, '$')
+    return s
+
+
+def _compile_replacement(regex, template):
+    """
+    將替換字串預先拆成 (字面字串或群組編號, ...)，回傳以此組字的函式
+    (例如 ('photo_', 1) -> lambda m: 'photo_' + (m[1] or ''))。
+    Python 3.11 的 re.sub 每次都要重新展開字串範本，改用函式約快 2 倍。
+    含其他跳脫字元時回傳原字串，交由 re 處理。
+    """
+    if '\\' not in template:
+        return template
+    parts = []
+    for m in _TEMPLATE_TOKEN.finditer(template):
+        name, number, other, literal = m.groups()
+        if literal is not None:
+            parts.append(literal)
+        elif number is not None:
+            if int(number) > regex.groups:
+                return template
+            parts.append(int(number))
+        elif name is not None:
+            if name.isdigit():
+                if int(name) > regex.groups:
+                    return template
+                parts.append(int(name))
+            elif name in regex.groupindex:
+                parts.append(regex.groupindex[name])
+            else:
+                return template
+        else:
+            return template
+    parts = tuple(parts)
+    return lambda m: "".join([p if p.__class__ is str else (m[p] or "") for p in parts])
+
+
+@lru_cache(maxsize=64)
+def compile_rule(pattern, repl):
+    """
+    回傳 (已編譯的 regex, 替換字串或函式)，依 (pattern, repl) 快取。
+    pattern 不合法時拋出 re.error (不會被快取)。
+    替換字串本身不合法 (例如引用不存在的群組) 時每個檔名都會失敗而保留原名，替換回傳 None。
+    """
+    regex = re.compile(pattern)
+    replacement = _compile_replacement(regex, convert_repl_format(repl))
+    if isinstance(replacement, str):
+        try:
+            # re 在比對前就會解析範本，對空字串替換一次即可驗證
+            regex.sub(replacement, "")
+        except (re.error, IndexError):
+            replacement = None
+    return regex, replacement
+
+
+def apply_rule(pattern, repl, names):
+    """對一批檔名套用規則"""
+    regex, replacement = compile_rule(pattern, repl)
+    if replacement is None:
+        return list(names)
+    return list(map(partial(regex.sub, replacement), names))
+
+
+def _apply_chunk(args):
+    return apply_rule(*args)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, min(8, os.cpu_count() or 1)))
+        return _pool
+
+
+# PreviewTable.flags 的位元
+IS_DIR = 1
+IS_OVERRIDDEN = 2
+
+
+class PreviewRow:
+    """PreviewTable 中一列的唯讀檢視；完整路徑在讀取時才組合"""
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def id(self):
+        return self.table.ids[self.index]
+
+    @property
+    def dir(self):
+        return DIRS.path(self.table.dirs[self.index])
+
+    @property
+    def original(self):
+        return self.table.names[self.index]
+
+    @property
+    def new(self):
+        return self.table.new_names[self.index]
+
+    @property
+    def full_old(self):
+        return DIRS.join(self.table.dirs[self.index], self.table.names[self.index])
+
+    @property
+    def full_new(self):
+        return DIRS.join(self.table.dirs[self.index], self.table.new_names[self.index])
+
+    @property
+    def status(self):
+        return self.table.statuses[self.index]
+
+    @property
+    def is_dir(self):
+        return bool(self.table.flags[self.index] & IS_DIR)
+
+    @property
+    def is_overridden(self):
+        return bool(self.table.flags[self.index] & IS_OVERRIDDEN)
+
+
+class PreviewTable:
+    """
+    預覽結果，以欄位陣列保存 (每列不再建立 dict)：
+    ids / dirs 為 array，names / new_names / statuses 為共用字串的串列，flags 為 bytearray。
+    保存的是計算當下的快照，之後檔案被重命名或移除也不會改變。
+    可當作 PreviewRow 的序列使用 (len、索引、迭代)。
+    """
+    __slots__ = ('ids', 'dirs', 'names', 'new_names', 'statuses', 'flags')
+
+    def __init__(self, ids, dirs, names, new_names, statuses, flags):
+        self.ids = ids
+        self.dirs = dirs
+        self.names = names
+        self.new_names = new_names
+        self.statuses = statuses
+        self.flags = flags
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError(index)
+        return PreviewRow(self, index)
+
+    def __iter__(self):
+        return map(PreviewRow, itertools.repeat(self), range(len(self.ids)))
+
+
+class PreviewEngine:
+    """
+    增量預覽引擎。
+    - 存在與衝突判斷全部查 DirectoryCache，不對每列呼叫 os.path.exists
+    - 「同名」依 DirectoryCache.folding 判斷 (大小寫、Unicode 正規化)
+    - 檔案紀錄本身就是 (資料夾索引, 檔名)，計算時不拆解或組合路徑；結果為 PreviewTable 欄位陣列
+    - 逐檔 RegEx 結果依 (pattern, repl) 記憶 {原檔名: 新檔名}；未命中的檔名整批計算，數量大時分塊平行處理
+    - 檔案表與資料夾快照都沒有變動時，最近的完整結果直接回傳
+    """
+    def __init__(self, files, dir_cache):
+        self.files = files
+        self.dir_cache = dir_cache
+        self._memos = OrderedDict()
+        self._results = OrderedDict() # (pattern, repl) -> (版本, 結果)
+
+    def _memo_for(self, pattern, repl):
+        key = (pattern, repl)
+        memo = self._memos.get(key)
+        if memo is None:
+            memo = self._memos[key] = {}
+            while len(self._memos) > MEMO_PATTERNS:
+                self._memos.popitem(last=False)
+        else:
+            self._memos.move_to_end(key)
+        return memo
+
+    def _state(self):
+        return self.files.version, self.dir_cache.version
+
+    def _fill_memo(self, pattern, repl, names, memo, should_cancel):
+        # 單核心時行程池只會多出傳輸成本
+        if len(names) < PARALLEL_THRESHOLD or (os.cpu_count() or 1) < 2:
+            memo.update(zip(names, apply_rule(pattern, repl, names)))
+            return
+        chunks = [names[i:i + PARALLEL_CHUNK] for i in range(0, len(names), PARALLEL_CHUNK)]
+        results = _get_pool().map(_apply_chunk, [(pattern, repl, chunk) for chunk in chunks])
+        for chunk, result in zip(chunks, results):
+            if should_cancel and should_cancel():
+                raise PreviewCancelled()
+            memo.update(zip(chunk, result))
+
+    def compute(self, pattern, repl, should_cancel=None):
+        key = (pattern, repl)
+        hit = self._results.get(key)
+        if hit is not None and hit[0] == self._state():
+            self._results.move_to_end(key)
+            return hit[1]
+
+        memo = None
+        regex_error = None
+
+        if pattern:
+            try:
+                compile_rule(pattern, repl)
+                memo = self._memo_for(pattern, repl)
+            except re.error as e:
+                regex_error = f"RegEx 錯誤: {e}"
+
+        records = self.files.rows()
+        snapshot = self.dir_cache.snapshot
+        name_key = self.dir_cache.folding.key
+        snaps = {} # 資料夾索引 -> 快照
+
+        # 第一階段：收集尚未計算過的檔名
+        missing = set()
+        for i, item in enumerate(records):
+            if should_cancel and i % CANCEL_CHECK_INTERVAL == 0 and should_cancel():
+                raise PreviewCancelled()
+            if item.override_name:
+                continue
+            if regex_error:
+                return [], regex_error, False
+            if memo is not None and item.name not in memo:
+                missing.add(item.name)
+
+        if missing:
+            with tracing.span("preview.regex", names=len(missing)):
+                self._fill_memo(pattern, repl, list(missing), memo, should_cancel)
+
+        # 第二階段：決定新檔名與初步狀態；目標被佔用的列先標記為 blocked
+        new_names = []
+        statuses = []
+        seen_targets = set()
+        moving = {} # 會被移走的 (資料夾索引, 原檔名) -> 列索引
+        occupants = {} # blocked 的列索引 -> 佔用目標的 (資料夾索引, 檔名)
+        for i, item in enumerate(records):
+            if should_cancel and i % CANCEL_CHECK_INTERVAL == 0 and should_cancel():
+                raise PreviewCancelled()
+
+            dir_index = item.dir
+            old_name = item.name
+            # 邏輯判斷：優先權 Override > RegEx
+            if item.override_name:
+                new_name = item.override_name
+            elif memo is not None:
+                new_name = memo[old_name]
+            else:
+                new_name = old_name # 預設不變
+
+            # 以快取的資料夾清單判定狀態 (不呼叫 os.path.exists)
+            status = "ok"
+
+            target = (dir_index, new_name if name_key is None else name_key(new_name))
+            if target in seen_targets:
+                status = "duplicate"
+            elif new_name != old_name:
+                moving[(dir_index, old_name)] = i
+                snap = snaps.get(dir_index)
+                if snap is None:
+                    snap = snaps[dir_index] = snapshot(DIRS.path(dir_index))
+                occupant = snap.lookup(new_name)
+                # 只改大小寫時佔用者就是自己，不算衝突
+                if occupant is not None and occupant != old_name:
+                    status = "blocked"
+                    occupants[i] = (dir_index, occupant)
+
+            seen_targets.add(target)
+            new_names.append(new_name)
+            statuses.append(status)
+
+        # 第三階段：目標若會被另一列讓出 (互換、鏈狀改名) 則不算衝突
+        self._resolve_blocked(statuses, moving, occupants)
+
+        previews = PreviewTable(
+            array('q', [item.id for item in records]),
+            array('l', [item.dir for item in records]),
+            [item.name for item in records],
+            new_names,
+            statuses,
+            # 讓 UI 知道哪些是資料夾、哪些是 AI 命名的
+            bytearray((IS_DIR if item.is_dir else 0) | (IS_OVERRIDDEN if item.override_name else 0)
+                      for item in records),
+        )
+        has_conflict = statuses.count("ok") != len(statuses)
+        result = (previews, None, has_conflict)
+        self._results[key] = (self._state(), result)
+        self._results.move_to_end(key)
+        while len(self._results) > RESULT_MEMO:
+            self._results.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _resolve_blocked(statuses, moving, occupants):
+        """
+        blocked 的列沿著「目標 → 佔用目標的列」往下走：
+        走到會順利移走的列 (ok) 或回到路徑上的列 (環) 時整條都可以執行，
+        走到不會移動的檔案或衝突的列時整條都是 conflict。每列只會被走過一次。
+        """
+        for start in range(len(statuses)):
+            if statuses[start] != "blocked":
+                continue
+            path = []
+            on_path = set()
+            j = start
+            while True:
+                status = statuses[j]
+                if status != "blocked":
+                    result = "ok" if status == "ok" else "conflict"
+                    break
+                if j in on_path:
+                    result = "ok"
+                    break
+                on_path.add(j)
+                path.append(j)
+                j = moving.get(occupants[j])
+                if j is None:
+                    result = "conflict"
+                    break
+            for j in path:
+                statuses[j] = result
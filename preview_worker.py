@@ -0,0 +1,94 @@
+import threading
+import time
+
+from preview_engine import PreviewCancelled
+
+
+class PreviewWorker:
+    """
+    在背景執行緒計算預覽。
+    - 去抖動：請求後等待 delay 秒，期間的新請求會取代舊請求
+    - 世代編號：每次請求 (或 cancel) 都會遞增，計算中的舊世代會被中止，
+      on_result 只會收到最新世代的結果
+    on_result(generation, (previews, error, has_conflict)) 於背景執行緒呼叫。
+    """
+    def __init__(self, manager, on_result, delay=0.15):
+        self.manager = manager
+        self.on_result = on_result
+        self.delay = delay
+        self.generation = 0
+        self._pending = None
+        self._computing = False
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, pattern, repl, delay=None):
+        with self._cond:
+            self.generation += 1
+            due = time.monotonic() + (self.delay if delay is None else delay)
+            self._pending = (self.generation, pattern, repl, due)
+            self._cond.notify()
+            return self.generation
+
+    def cancel(self):
+        """捨棄排隊中的請求並中止計算中的預覽"""
+        with self._cond:
+            self.generation += 1
+            self._pending = None
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    @property
+    def busy(self):
+        """是否有排隊中或計算中的預覽"""
+        with self._cond:
+            return self._pending is not None or self._computing
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self.generation += 1
+            self._pending = None
+            self._cond.notify()
+
+    def _next_request(self):
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                wait = self._pending[3] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                req, self._pending = self._pending, None
+                self._computing = True
+                return req
+
+    def _run(self):
+        while True:
+            req = self._next_request()
+            if req is None:
+                return
+            generation, pattern, repl, _ = req
+
+            def should_cancel():
+                return generation != self.generation
+
+            try:
+                result = self.manager.get_preview(pattern, repl, should_cancel)
+            except PreviewCancelled:
+                continue
+            except Exception as e:
+                result = ([], f"預覽失敗: {e}", False)
+            finally:
+                with self._cond:
+                    self._computing = False
+
+            if self.is_current(generation):
+                self.on_result(generation, result)
@@ -0,0 +1,200 @@
+import ctypes
+import errno
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutionReport:
+    """一次執行的統計：步驟數、完成數、耗時與吞吐量"""
+    __slots__ = ('steps', 'completed', 'elapsed', 'workers')
+
+    def __init__(self, steps, completed, elapsed, workers):
+        self.steps = steps
+        self.completed = completed
+        self.elapsed = elapsed
+        self.workers = workers
+
+    @property
+    def rate(self):
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f"{self.completed}/{self.steps} 個步驟，{self.elapsed:.2f} 秒，{self.rate:.0f} 個/秒 ({self.workers} 執行緒)"
+
+
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1 # Linux renameat2
+RENAME_EXCL = 4 # macOS renamex_np
+
+_native = None
+
+
+def _native_rename():
+    """回傳以 (src, dst) 呼叫、不覆蓋目標的系統 rename，平台不支援時回傳 None"""
+    global _native
+    if _native is None:
+        _native = False
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if sys.platform.startswith("linux"):
+                func = libc.renameat2
+                func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+                _native = lambda src, dst: func(AT_FDCWD, src, AT_FDCWD, dst, RENAME_NOREPLACE)
+            elif sys.platform == "darwin":
+                func = libc.renamex_np
+                func.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint]
+                _native = lambda src, dst: func(src, dst, RENAME_EXCL)
+        except (OSError, AttributeError):
+            pass
+    return _native or None
+
+
+def _link_rename(src, dst):
+    """以硬連結搬移檔案：link 在目標已存在時必定失敗；不支援 (資料夾、FAT 等) 時回傳 False"""
+    try:
+        os.link(src, dst, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError):
+        return False
+    try:
+        os.unlink(src)
+    except OSError:
+        os.unlink(dst)
+        raise
+    return True
+
+
+def rename_no_replace(src, dst):
+    """
+    同 os.rename，但不覆蓋其他檔案 (POSIX 的 rename 會直接取代已存在的目標)。
+    目標已存在且不是來源本身 (只改大小寫時會指向同一個檔案) 時拋出 FileExistsError。
+    檢查與改名是同一個系統呼叫：Windows 的 rename 本身不覆蓋，Linux 用 renameat2 (RENAME_NOREPLACE)，
+    macOS 用 renamex_np (RENAME_EXCL)；檔案系統不支援時檔案改用 link + unlink，
+    兩者都不可用 (例如 FAT 上的資料夾) 時才退回先檢查再改名。
+    """
+    if os.path.lexists(dst):
+        try:
+            same = os.path.samestat(os.lstat(src), os.lstat(dst))
+        except OSError:
+            same = False
+        if not same:
+            raise FileExistsError(errno.EEXIST, "目標已存在", dst)
+        os.rename(src, dst)
+        return
+    if sys.platform == "win32":
+        os.rename(src, dst)
+        return
+    native = _native_rename()
+    if native is not None:
+        if native(os.fsencode(src), os.fsencode(dst)) == 0:
+            return
+        code = ctypes.get_errno()
+        if code == errno.EEXIST:
+            raise FileExistsError(code, "目標已存在", dst)
+        if code not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise OSError(code, os.strerror(code), src, None, dst)
+    if not _link_rename(src, dst):
+        os.rename(src, dst)
+
+
+class RenameExecutor:
+    """
+    平行執行 rename_planner 產生的步驟群組。
+    群組 (鏈或環) 之間互不相依，群組內必須依序執行；
+    同一資料夾的群組合併成最多 chunk_size 個步驟的工作，由執行緒池並行處理。
+    網路磁碟 (SMB/NFS) 上每次 rename 都要等一次往返，並行後總耗時約為原本的 1/workers。
+    任一步驟失敗後不再開始新的群組；失敗的若是環，會把該環已執行的步驟改回去。
+    目標已被其他檔案佔用 (例如預覽之後才出現) 的步驟視為失敗，不會覆蓋 (見 rename_no_replace)。
+    """
+    MAX_WORKERS = 16
+    # 步驟少於此數時直接在呼叫端執行，不啟動執行緒
+    PARALLEL_THRESHOLD = 64
+
+    def __init__(self, workers=None, chunk_size=256):
+        self.workers = workers or self.MAX_WORKERS
+        self.chunk_size = chunk_size
+
+    def _make_tasks(self, groups):
+        """依資料夾分組並切塊；回傳 [[(第一步的全域編號, 群組), ...], ...]"""
+        by_dir = {}
+        offset = 0
+        for group in groups:
+            by_dir.setdefault(os.path.dirname(group[0][0]), []).append((offset, group))
+            offset += len(group)
+
+        tasks = []
+        for items in by_dir.values():
+            task, size = [], 0
+            for offset, group in items:
+                task.append((offset, group))
+                size += len(group)
+                if size >= self.chunk_size:
+                    tasks.append(task)
+                    task, size = [], 0
+            if task:
+                tasks.append(task)
+        return tasks
+
+    def run(self, groups, on_step=None):
+        """
+        groups: [[(來源, 目標, 移動編號), ...], ...]，步驟的全域編號依群組攤平後的順序
+        on_step(全域編號): 每完成一步呼叫一次 (可能在不同執行緒)
+        回傳: (完成的移動編號集合, 仍保持已執行的步驟編號 (遞增), 例外或 None, ExecutionReport)
+        """
+        start = time.perf_counter()
+        total = sum(len(g) for g in groups)
+        tasks = self._make_tasks(groups)
+        stop = threading.Event()
+        errors = []
+
+        def run_task(task):
+            applied = []
+            for offset, group in task:
+                if stop.is_set():
+                    break
+                parked = None
+                try:
+                    for k, (src, dst, op) in enumerate(group):
+                        rename_no_replace(src, dst)
+                        applied.append((offset + k, op))
+                        if on_step:
+                            on_step(offset + k)
+                        if op is None:
+                            parked = len(applied) - 1
+                except Exception as e:
+                    stop.set()
+                    errors.append(e)
+                    if parked is not None:
+                        self._unwind(group, applied, parked, offset)
+                    break
+            return applied
+
+        workers = 1
+        if total < self.PARALLEL_THRESHOLD or len(tasks) == 1:
+            results = [run_task(task) for task in tasks]
+        else:
+            workers = min(self.workers, len(tasks))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rename") as pool:
+                results = list(pool.map(run_task, tasks))
+
+        applied = sorted(item for result in results for item in result)
+        done = {op for _, op in applied if op is not None}
+        report = ExecutionReport(total, len(applied), time.perf_counter() - start, workers)
+        return done, [i for i, _ in applied], (errors[0] if errors else None), report
+
+    @staticmethod
+    def _unwind(group, applied, parked, offset):
+        """環在中途失敗：從暫存步驟開始的已執行步驟依反序改回，並從 applied 移除"""
+        while len(applied) > parked:
+            i, _ = applied[-1]
+            src, dst, _ = group[i - offset]
+            try:
+                rename_no_replace(dst, src)
+            except OSError as e:
+                print(f"Warning: 無法還原 {dst} -> {src} ({e})", file=sys.stderr)
+                return
+            applied.pop()
@@ -0,0 +1,249 @@
+import json
+import os
+import threading
+
+from app_paths import data_path
+import file_lock
+
+
+def _file_id(path):
+    """(st_dev, st_ino)；檔案系統不提供 inode 時回傳 None"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return [st.st_dev, st.st_ino] if st.st_ino else None
+
+
+class JournalState:
+    """
+    從日誌讀回的未完成批次。
+    steps: [(舊路徑, 新路徑), ...]，依原本的執行順序
+    applied: 每一步是否已完成 (由完成紀錄與實際檔案狀態判斷)
+    """
+    def __init__(self, batch_id, kind, steps, file_ids, done):
+        self.batch_id = batch_id
+        self.kind = kind
+        self.steps = steps
+        self.file_ids = file_ids
+        self.done = done
+        self.applied = None
+
+    @property
+    def total(self):
+        return len(self.steps)
+
+    @property
+    def applied_count(self):
+        return sum(self.applied) if self.applied is not None else len(self.done)
+
+    def resolve(self):
+        """
+        判斷每一步是否已完成。完成紀錄是分批 fsync 的，最後一批可能遺失，
+        因此依 inode 追蹤每個檔案目前位在自己路徑鏈的哪一步。
+        """
+        applied = [i in self.done for i in range(len(self.steps))]
+        chains = {}
+        for i, file_id in enumerate(self.file_ids):
+            chains.setdefault(tuple(file_id) if file_id else ("step", i), []).append(i)
+
+        for key, indices in chains.items():
+            if key[0] == "step":
+                # 沒有 inode 可比對，退回以路徑是否存在判斷
+                i = indices[0]
+                old, new = self.steps[i]
+                if not applied[i] and os.path.lexists(new) and not os.path.lexists(old):
+                    applied[i] = True
+                continue
+            # 從最後一步往前找檔案目前所在的位置
+            for pos in range(len(indices) - 1, -1, -1):
+                if _file_id(self.steps[indices[pos]][1]) == list(key):
+                    for i in indices[:pos + 1]:
+                        applied[i] = True
+                    for i in indices[pos + 1:]:
+                        applied[i] = False
+                    break
+            else:
+                if _file_id(self.steps[indices[0]][0]) == list(key):
+                    for i in indices:
+                        applied[i] = False
+        self.applied = applied
+        return applied
+
+    def remaining_steps(self):
+        if self.applied is None:
+            self.resolve()
+        return [step for step, ok in zip(self.steps, self.applied) if not ok]
+
+    def applied_steps(self):
+        if self.applied is None:
+            self.resolve()
+        return [step for step, ok in zip(self.steps, self.applied) if ok]
+
+
+class RenameJournal:
+    """
+    重命名的預寫日誌 (JSON lines)：
+        {"type": "begin", "batch": ..., "kind": "rename" | "undo" | "redo", "total": N}
+        {"type": "plan", "i": 0, "old": ..., "new": ..., "file": [dev, ino]}
+        {"type": "done", "i": 0}
+        {"type": "commit"}
+    執行前先寫入完整計畫並 fsync；完成紀錄每 FSYNC_EVERY 筆才 fsync 一次。
+    批次正常結束後刪除日誌，因此日誌仍存在且沒有行程持有它的鎖，就代表寫入它的行程中途中斷。
+
+    每個行程寫入自己的 rename_journal-<pid>.jsonl，執行期間持有該檔的鎖 (file_lock)，
+    其他行程 (例如同時執行的 CLI) 不會把執行中的批次當成中斷，也不會刪除它。
+    """
+    FSYNC_EVERY = 512
+    PREFIX = "rename_journal"
+
+    def __init__(self, path=None):
+        self.path = path or data_path(f"{self.PREFIX}-{os.getpid()}.jsonl")
+        self.directory = os.path.dirname(self.path)
+        self._file = None
+        self._lock_fd = None
+        self._claimed = None # load() 找到的中斷日誌 (路徑, 鎖 fd)，處理完之前持有它的鎖
+        self._unsynced = 0
+        self._lock = threading.Lock() # 平行執行時 done 會在多個執行緒呼叫
+
+    @property
+    def active(self):
+        return self._file is not None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def begin(self, batch_id, kind, steps):
+        """steps: [(舊路徑, 新路徑), ...]；同一檔案的後續步驟 (例如暫存名稱) 沿用第一步的 inode"""
+        # 先鎖再寫入，其他行程不會讀到寫了一半的計畫而把它當成中斷的批次刪除
+        self._lock_fd = file_lock.open_locked(self.path)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._unsynced = 0
+        write = self._file.write
+        write(json.dumps({"type": "begin", "batch": batch_id, "kind": kind, "total": len(steps)}, ensure_ascii=False) + "\n")
+        moved_ids = {}
+        for i, (old, new) in enumerate(steps):
+            file_id = moved_ids.pop(old, None) or _file_id(old)
+            moved_ids[new] = file_id
+            write(json.dumps({"type": "plan", "i": i, "old": old, "new": new, "file": file_id}, ensure_ascii=False) + "\n")
+        self._sync()
+        # 恢復中斷的批次時，新日誌 (kind = recover) 已描述剩下的工作，舊日誌可以移除
+        self._drop_claim()
+
+    def done(self, i):
+        with self._lock:
+            self._file.write('{"type": "done", "i": %d}\n' % i)
+            self._unsynced += 1
+            if self._unsynced >= self.FSYNC_EVERY:
+                self._sync()
+
+    def commit(self):
+        """批次結束 (含部分失敗)；呼叫前需已將結果寫入歷史紀錄"""
+        if self._file is not None:
+            self._file.write('{"type": "commit"}\n')
+            self._sync()
+            self._file.close()
+            self._file = None
+        fd, self._lock_fd = self._lock_fd, None
+        self._remove_locked(self.path, fd)
+        self._drop_claim()
+
+    def discard(self):
+        """刪除本行程的日誌 (未持有鎖時)"""
+        if self._lock_fd is None:
+            _remove(self.path)
+
+    def _drop_claim(self):
+        claimed, self._claimed = self._claimed, None
+        if claimed is not None:
+            self._remove_locked(*claimed)
+
+    @staticmethod
+    def _remove_locked(path, fd):
+        """持有鎖時刪除 (Windows 無法刪除開啟中的檔案，改為釋放鎖後再刪除)"""
+        removed = _remove(path)
+        if fd is not None:
+            file_lock.release(fd)
+        if not removed:
+            _remove(path)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _candidates(self):
+        try:
+            names = os.listdir(self.directory or os.curdir)
+        except OSError:
+            return []
+        return sorted(
+            os.path.join(self.directory, name) for name in names
+            if name.startswith(self.PREFIX) and name.endswith(".jsonl")
+        )
+
+    def load(self):
+        """
+        尋找已中斷的批次：日誌存在且沒有行程持有它的鎖 (寫入它的行程已結束)。
+        找到時持有該日誌的鎖，直到恢復完成 (begin/commit)，其他行程不會重複處理。
+        已寫入 commit 或計畫未寫完的殘留日誌會被刪除。
+        回傳: JournalState；沒有中斷的批次時回傳 None
+        """
+        for path in self._candidates():
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except OSError:
+                continue
+            if not file_lock.try_lock(fd):
+                os.close(fd) # 其他行程正在執行這個批次
+                continue
+            state = self._read(path)
+            if state is None:
+                self._remove_locked(path, fd)
+                continue
+            self._claimed = (path, fd)
+            return state
+        return None
+
+    @staticmethod
+    def _read(path):
+        """回傳: JournalState；日誌已寫入 commit 或計畫不完整時回傳 None"""
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+        header = None
+        steps, file_ids, done = [], [], set()
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break # 最後一行可能只寫了一半
+                kind = rec.get("type")
+                if kind == "plan":
+                    steps.append((rec["old"], rec["new"]))
+                    file_ids.append(rec.get("file"))
+                elif kind == "done":
+                    done.add(rec["i"])
+                elif kind == "begin":
+                    header = rec
+                elif kind == "commit":
+                    return None
+
+        if header is None or len(steps) != header.get("total"):
+            # 計畫尚未完整寫入就中斷，此時還沒有任何檔案被改名
+            return None
+        return JournalState(header["batch"], header["kind"], steps, file_ids, done)
+
+
+def _remove(path):
+    """回傳檔案是否已不存在"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,90 @@
+import os
+import uuid
+
+
+class PlanError(ValueError):
+    """重命名計畫不合法 (例如兩個檔案要改成同一個名稱)"""
+    pass
+
+
+def _temp_path(src, exists):
+    dir_name, name = os.path.split(src)
+    while True:
+        tmp = os.path.join(dir_name, f".{name}.{uuid.uuid4().hex[:8]}.renaming")
+        if not exists(tmp):
+            return tmp
+
+
+def plan_renames(moves, exists=os.path.lexists, key=None):
+    """
+    將一組重命名 [(舊路徑, 新路徑), ...] 排成可直接依序執行的步驟。
+
+    若某個目標路徑正被另一個要移走的檔案佔用，必須等它先移走；
+    因為來源與目標都不重複，每個移動最多被一個移動阻擋，依賴圖只會是不相交的鏈或環，O(n) 即可排序：
+      - 鏈：從目標空著的那一端開始往回執行 (file_2→file_3 先於 file_1→file_2)
+      - 環：先把其中一個檔案移到暫存名稱，繞完一圈再移回目標 (a→tmp, b→a, tmp→b)
+
+    key: 路徑比較用的函式 (DirectoryCache.path_key)，不分大小寫的檔案系統上
+         README→readme 這種只改大小寫的移動會被視為長度 1 的環，經由暫存名稱完成。
+
+    回傳: 步驟群組列表，每個群組是一條鏈或一個環，群組之間互不相依。
+    步驟為 (來源, 目標, 移動編號)；環的第一步 (移到暫存名稱) 的移動編號為 None。
+    """
+    key = key or (lambda p: p)
+    keys = [(key(src), key(dst)) for src, dst in moves]
+    by_src = {}
+    by_dst = {}
+    for i, (src, dst) in enumerate(moves):
+        if src == dst:
+            raise PlanError(f"來源與目標相同: {src}")
+        src_key, dst_key = keys[i]
+        if src_key in by_src:
+            raise PlanError(f"重複的來源: {src}")
+        if dst_key in by_dst:
+            raise PlanError(f"多個檔案要改成同一個名稱: {dst}")
+        by_src[src_key] = i
+        by_dst[dst_key] = i
+
+    groups = []
+    visited = [False] * len(moves)
+
+    # 鏈：目標不是其他移動的來源時可直接執行，接著執行等待它讓出位置的移動
+    for i, (src, dst) in enumerate(moves):
+        if keys[i][1] in by_src:
+            continue
+        group = []
+        j = i
+        while j is not None:
+            visited[j] = True
+            group.append((moves[j][0], moves[j][1], j))
+            j = by_dst.get(keys[j][0])
+        groups.append(group)
+
+    # 其餘的都在環上
+    for i, (src, dst) in enumerate(moves):
+        if visited[i]:
+            continue
+        tmp = _temp_path(src, exists)
+        group = [(src, tmp, None)]
+        visited[i] = True
+        j = by_dst[keys[i][0]]
+        while j != i:
+            visited[j] = True
+            group.append((moves[j][0], moves[j][1], j))
+            j = by_dst[keys[j][0]]
+        group.append((tmp, dst, i))
+        groups.append(group)
+
+    return groups
+
+
+def flatten(groups):
+    return [step for group in groups for step in group]
+
+
+def collapse_steps(steps):
+    """將含暫存名稱的步驟還原成最終的 [(原路徑, 新路徑), ...] (用於中斷恢復後的歷史紀錄)"""
+    origin_of = {}
+    for src, dst in steps:
+        origin_of[dst] = origin_of.pop(src, src)
+    return [(origin, dst) for dst, origin in origin_of.items() if origin != dst]
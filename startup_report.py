@@ -0,0 +1,124 @@
+"""
+啟動時間報告：以 python -X importtime 啟動 main.pyw --startup-probe，列出各模組的載入成本。
+
+    python startup_report.py                 # 主程式 (需要顯示器；沒有顯示器時只報告載入成本)
+    python startup_report.py --module autorenamer --top 15
+    python startup_report.py --json > startup.json
+
+載入成本來自 CPython 的 -X importtime (每個模組自己的耗時與含子模組的累計耗時)。
+「第三方套件」依最上層套件名稱彙總 self 耗時，「本專案模組」列出累計耗時。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def project_modules():
+    names = set()
+    for name in os.listdir(ROOT):
+        base, ext = os.path.splitext(name)
+        if ext in (".py", ".pyw"):
+            names.add(base)
+    return names
+
+
+def parse_importtime(stderr):
+    """回傳 [(模組名稱, 層級, self 微秒, 累計微秒), ...]，依載入完成的順序"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue # 標題列
+        raw = parts[2].rstrip()
+        name = raw.lstrip()
+        level = (len(raw) - len(name) - 1) // 2
+        rows.append((name, level, self_us, cumulative_us))
+    return rows
+
+
+def run_probe(target):
+    """回傳 (importtime 紀錄, 探測結果 dict 或 None, 整個行程耗時, 錯誤訊息)"""
+    if target.endswith((".py", ".pyw")):
+        cmd = [sys.executable, "-X", "importtime", os.path.join(ROOT, target), "--startup-probe"]
+    else:
+        cmd = [sys.executable, "-X", "importtime", "-c", f"import {target}"]
+
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, timeout=120)
+    elapsed = time.perf_counter() - start
+
+    result = None
+    for line in proc.stdout.splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+    error = None
+    if proc.returncode != 0:
+        lines = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        error = lines[-1] if lines else f"結束代碼 {proc.returncode}"
+    return parse_importtime(proc.stderr), result, elapsed, error
+
+
+def summarize(rows, top):
+    own = project_modules()
+    by_package = {}
+    for name, _, self_us, _ in rows:
+        root = name.split(".", 1)[0]
+        if root not in own:
+            by_package[root] = by_package.get(root, 0) + self_us
+    # 同一模組只會載入一次，累計耗時取該模組自己那一列
+    project = [(name, cumulative_us) for name, _, _, cumulative_us in rows if name in own]
+    return {
+        "total_import_us": sum(self_us for _, _, self_us, _ in rows),
+        "module_count": len(rows),
+        "packages": sorted(by_package.items(), key=lambda kv: -kv[1])[:top],
+        "project": sorted(project, key=lambda kv: -kv[1]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AutoRenamer 啟動時間報告")
+    parser.add_argument("--module", default="main.pyw", help="要量測的腳本 (.py/.pyw) 或模組名稱，預設 main.pyw")
+    parser.add_argument("--top", type=int, default=20, help="列出載入成本最高的幾個第三方套件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    rows, probe, elapsed, error = run_probe(args.module)
+    summary = summarize(rows, args.top)
+    report = dict(summary, target=args.module, process_seconds=elapsed, probe=probe, error=error)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"目標: {args.module}")
+    print(f"行程總耗時: {elapsed:.3f} 秒 (含直譯器啟動)")
+    print(f"載入 {summary['module_count']} 個模組，共 {summary['total_import_us'] / 1e6:.3f} 秒")
+    if probe:
+        print(f"模組載入完成: {probe['imports']:.3f} 秒，視窗出現: {probe['window_shown']:.3f} 秒")
+    if error:
+        print(f"未完成啟動: {error}")
+
+    print("\n第三方套件 (self 耗時合計):")
+    for name, us in summary["packages"]:
+        print(f"  {name:<28} {us / 1000:9.1f} ms")
+    print("\n本專案模組 (含子模組的累計耗時):")
+    for name, us in summary["project"]:
+        print(f"  {name:<28} {us / 1000:9.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+本機的 OpenAI 相容模擬伺服器 (chat completions)，用於離線測試 AI 命名的吞吐量與重試行為。
+
+    python -m stub_server --port 8765 --latency 0.3 --jitter 0.1 --error-rate 0.02 --rate-limit 0.05
+    python -m stub_server --reject max_tokens --reject reasoning_effort
+
+接著將 API Endpoint 設為 http://127.0.0.1:8765/v1 (任意 API Key)。
+GET /stats 回傳目前的請求統計 (JSON)。
+
+模擬項目：
+  - 回應延遲：latency ± jitter 秒，另加每 KB 請求內容 per_kb 秒 (模擬上傳圖片)
+  - 隨機 500 錯誤 (error_rate) 與 429 (rate_limit)，429 附帶 Retry-After
+  - rpm：每分鐘請求數上限，超過時回傳 429 與需等待的秒數
+  - reject：不接受的參數 (max_tokens / max_completion_tokens / reasoning_effort)，回傳與代理相同格式的 400
+  - 多檔請求 (使用者訊息含 '=== FILE <id> (<副檔名>) ===' 區段) 回傳 JSON 陣列；batch_drop 為每個檔案被漏掉的機率
+不依賴任何第三方套件。
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REJECTABLE = ("max_tokens", "max_completion_tokens", "reasoning_effort")
+
+_REJECT_MESSAGES = {
+    "max_tokens": "Unsupported parameter: 'max_tokens' is not supported with this model. Use 'max_completion_tokens' instead.",
+    "max_completion_tokens": "Unsupported parameter: 'max_completion_tokens' is not supported with this model. Use 'max_tokens' instead.",
+    "reasoning_effort": "Unrecognized request argument supplied: reasoning_effort",
+}
+
+
+class StubConfig:
+    """模擬伺服器的行為設定；機率以 seed 決定，相同設定與請求順序會得到相同結果"""
+    __slots__ = ('latency', 'jitter', 'per_kb', 'error_rate', 'rate_limit', 'retry_after', 'rpm', 'reject',
+                 'batch_drop', 'api_key', 'seed')
+
+    def __init__(self, latency=0.0, jitter=0.0, per_kb=0.0, error_rate=0.0, rate_limit=0.0,
+                 retry_after=1.0, rpm=None, reject=(), batch_drop=0.0, api_key=None, seed=0):
+        unknown = set(reject) - set(REJECTABLE)
+        if unknown:
+            raise ValueError(f"不支援的 reject 參數: {', '.join(sorted(unknown))}")
+        self.latency = latency
+        self.jitter = jitter
+        self.per_kb = per_kb
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.reject = tuple(reject)
+        self.batch_drop = batch_drop
+        self.api_key = api_key
+        self.seed = seed
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'api_key'}
+
+
+_FILE_HEADER = re.compile(r"^=== FILE (\d+) \(([^)]*)\) ===$", re.M)
+
+
+def user_text(messages):
+    text = ""
+    for msg in messages:
+        if msg.get("role") != "user":
+            continue
+        content = msg.get("content")
+        if isinstance(content, str):
+            text += content
+        elif isinstance(content, list):
+            text += "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return text
+
+
+def suggest_name(text):
+    """依內容產生固定的檔名：內容的前幾個英文單字 + 雜湊"""
+    words = re.findall(r"[a-z]+", text.lower())
+    digest = hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest()[:6]
+    return "_".join(words[:3] + [digest])
+
+
+def split_files(text):
+    """多檔請求：回傳 [(編號, 副檔名, 內容), ...]；不是多檔請求時回傳空串列"""
+    headers = list(_FILE_HEADER.finditer(text))
+    files = []
+    for i, m in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        files.append((int(m.group(1)), m.group(2), text[m.end():end].strip()))
+    return files
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # 保持連線，與 SDK 的連線池行為一致
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, err_type, param=None, code=None, headers=None):
+        self.server.stub.count(status)
+        self._send_json(status, {"error": {"message": message, "type": err_type, "param": param, "code": code}}, headers)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/stats":
+            self._send_json(200, self.server.stub.stats())
+        elif path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        stub = self.server.stub
+        config = stub.config
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        path = self.path.split("?")[0].rstrip("/")
+        if not path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        if config.api_key and self.headers.get("Authorization") != f"Bearer {config.api_key}":
+            self._send_error(401, "Incorrect API key provided.", "invalid_request_error", code="invalid_api_key")
+            return
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            self._send_error(400, "We could not parse the JSON body of your request.", "invalid_request_error")
+            return
+
+        for param in config.reject:
+            if param in request:
+                self._send_error(400, _REJECT_MESSAGES[param], "invalid_request_error", param=param, code="unsupported_parameter")
+                return
+
+        wait = stub.take_rate_slot()
+        if wait is not None:
+            self._send_error(429, "Rate limit reached for requests.", "requests",
+                             code="rate_limit_exceeded", headers={"Retry-After": f"{wait:.3f}"})
+            return
+
+        outcome, delay = stub.draw(len(raw))
+        time.sleep(delay)
+        if outcome == 429:
+            self._send_error(429, "Rate limit reached for requests.", "requests",
+                             code="rate_limit_exceeded", headers={"Retry-After": f"{config.retry_after:g}"})
+            return
+        if outcome == 500:
+            self._send_error(500, "The server had an error while processing your request.", "server_error")
+            return
+
+        text = user_text(request.get("messages") or [])
+        files = split_files(text)
+        if files:
+            entries = [{"id": i, "name": suggest_name(body) + ext} for i, ext, body in files if stub.keep_entry()]
+            name = json.dumps(entries)
+        else:
+            name = suggest_name(text)
+        stub.count(200)
+        self._send_json(200, {
+            "id": f"chatcmpl-stub{stub.next_id()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": name},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(raw) // 4, "completion_tokens": 8, "total_tokens": len(raw) // 4 + 8},
+        })
+
+
+class StubServer:
+    """
+    可在背景執行緒啟動的模擬伺服器 (測試與 benchmarks 使用)：
+        with StubServer(StubConfig(latency=0.2)) as server:
+            AIService.configure("key", server.base_url)
+    port 為 0 時自動選擇空閒的連接埠。
+    """
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._counts = Counter()
+        self._ids = 0
+        self._window = [] # rpm 限制：最近一分鐘內接受的請求時間
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, status):
+        with self._lock:
+            self._counts[status] += 1
+            self._counts["requests"] += 1
+
+    def next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def draw(self, request_bytes):
+        """回傳 (結果狀態碼, 延遲秒數)"""
+        config = self.config
+        with self._lock:
+            roll = self._rng.random()
+            delay = config.latency + (self._rng.uniform(-config.jitter, config.jitter) if config.jitter else 0.0)
+        delay = max(0.0, delay) + config.per_kb * request_bytes / 1024
+        if roll < config.rate_limit:
+            return 429, 0.0
+        if roll < config.rate_limit + config.error_rate:
+            return 500, delay
+        return 200, delay
+
+    def keep_entry(self):
+        if not self.config.batch_drop:
+            return True
+        with self._lock:
+            return self._rng.random() >= self.config.batch_drop
+
+    def take_rate_slot(self):
+        """rpm 限制：可以接受時回傳 None，否則回傳需等待的秒數"""
+        if not self.config.rpm:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            window = self._window
+            while window and now - window[0] >= 60.0:
+                window.pop(0)
+            if len(window) < self.config.rpm:
+                window.append(now)
+                return None
+            return 60.0 - (now - window[0])
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "requests": counts.pop("requests", 0),
+            "status": {str(k): v for k, v in sorted(counts.items())},
+            "config": self.config.to_dict(),
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser, prefix=""):
+    """加入模擬伺服器的參數；benchmarks 以 prefix='stub-' 共用"""
+    parser.add_argument(f"--{prefix}latency", type=float, default=0.0, help="每個請求的延遲秒數")
+    parser.add_argument(f"--{prefix}jitter", type=float, default=0.0, help="延遲的隨機變動範圍 (±秒)")
+    parser.add_argument(f"--{prefix}per-kb", type=float, default=0.0, help="每 KB 請求內容額外延遲的秒數")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0, help="回傳 500 的機率")
+    parser.add_argument(f"--{prefix}rate-limit", type=float, default=0.0, help="隨機回傳 429 的機率")
+    parser.add_argument(f"--{prefix}retry-after", type=float, default=1.0, help="隨機 429 的 Retry-After 秒數")
+    parser.add_argument(f"--{prefix}rpm", type=int, help="每分鐘請求數上限，超過時回傳 429")
+    parser.add_argument(f"--{prefix}reject", action="append", default=[], choices=REJECTABLE,
+                        help="不接受的參數 (可重複指定)，模擬只支援部分參數的代理")
+    parser.add_argument(f"--{prefix}batch-drop", type=float, default=0.0, help="多檔回應中漏掉每個檔案的機率 (測試單檔重試)")
+    parser.add_argument(f"--{prefix}seed", type=int, default=0, help="隨機種子")
+
+
+def config_from_args(args, prefix=""):
+    attr = prefix.replace("-", "_")
+    get = lambda name: getattr(args, attr + name)
+    return StubConfig(
+        latency=get("latency"), jitter=get("jitter"), per_kb=get("per_kb"),
+        error_rate=get("error_rate"), rate_limit=get("rate_limit"), retry_after=get("retry_after"),
+        rpm=get("rpm"), reject=get("reject"), batch_drop=get("batch_drop"), seed=get("seed"),
+        api_key=getattr(args, "api_key", None)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m stub_server", description="OpenAI 相容的本機模擬伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--api-key", help="只接受這個 API Key (預設接受任何值)")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StubServer(config_from_args(args), args.host, args.port)
+    print(f"模擬伺服器: {server.base_url}  (Ctrl+C 結束)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
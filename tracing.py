@@ -0,0 +1,356 @@
+"""
+輕量的追蹤與統計 (不依賴第三方套件)。
+
+以環境變數啟用，未啟用時 span() 回傳共用的空物件，幾乎沒有額外成本：
+    AUTORENAMER_TRACE=/tmp/autorenamer.json                 程式結束時輸出 counters / histograms (JSON)
+    AUTORENAMER_TRACE_FORMAT=chrome                          改為 Chrome trace 格式 (chrome://tracing、ui.perfetto.dev)
+
+用法：
+    with tracing.span("ai.request", model=model) as sp:
+        ...
+        sp.set(status="ok")
+    tracing.count("ai.cache_hit")
+    tracing.observe("ai.request_chars", n)
+
+span 的屬性一律經過 redact()：base64 資料 URL 只保留類型與長度、過長字串截斷、API Key 遮蔽，
+不會把整張圖片的內容寫進紀錄。
+子行程 (AIPipeline 的擷取/編碼) 以 drain() 取出紀錄交回主行程 merge()，只有主行程會輸出檔案。
+"""
+import atexit
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+# 字串屬性最多保留的字元數
+MAX_STRING = 256
+# 串列屬性最多保留的項目數
+MAX_ITEMS = 20
+REDACT_KEYS = {"api_key", "authorization", "password"}
+
+
+def redact(value, limit=MAX_STRING):
+    """回傳可安全寫入紀錄的精簡副本"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if value.startswith("data:"):
+            comma = value.find(",", 0, 128)
+            if comma != -1:
+                return f"<{value[5:comma]}, {len(value) - comma - 1} chars>"
+        if len(value) > limit:
+            return value[:limit] + f"...(+{len(value) - limit} chars)"
+        return value
+    if isinstance(value, dict):
+        return {
+            str(k): "***" if str(k).lower() in REDACT_KEYS else redact(v, limit)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        items = [redact(v, limit) for v in value[:MAX_ITEMS]]
+        if len(value) > MAX_ITEMS:
+            items.append(f"...(+{len(value) - MAX_ITEMS} items)")
+        return items
+    return redact(repr(value), limit)
+
+
+class Histogram:
+    """數值分布：精確的 count/sum/min/max，百分位數由最多 SAMPLES 個隨機樣本 (reservoir) 估計"""
+    __slots__ = ('count', 'total', 'min', 'max', 'samples')
+
+    SAMPLES = 4096
+    _rng = random.Random(0)
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = []
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if len(self.samples) < self.SAMPLES:
+            self.samples.append(value)
+        else:
+            i = self._rng.randrange(self.count)
+            if i < self.SAMPLES:
+                self.samples[i] = value
+
+    def merge(self, other):
+        for value in other.samples:
+            if len(self.samples) < self.SAMPLES:
+                self.samples.append(value)
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else None
+
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            "p99": pct(0.99),
+        }
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """計時區段；結束時把耗時 (秒) 記入同名的 histogram，Chrome 格式另外保留事件"""
+    __slots__ = ('tracer', 'name', 'attrs', 'start')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record_span(self.name, self.start, duration, self.attrs, exc_type is not None)
+        return False
+
+
+class Tracer:
+    """
+    收集 span、counter 與 histogram。
+    fmt: "json" (只輸出統計) 或 "chrome" (另外保留最多 MAX_EVENTS 個事件)
+    """
+    MAX_EVENTS = 200000
+    FORMATS = ("json", "chrome")
+
+    def __init__(self, path=None, fmt="json"):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"不支援的追蹤格式: {fmt}")
+        self.path = path
+        self.format = fmt
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = Counter()
+            self.histograms = {}
+            self.events = []
+            self.dropped = 0
+            self.threads = {} # ident -> 執行緒名稱 (本行程)
+            self.child_threads = {} # (pid, ident) -> 執行緒名稱 (子行程交回的)
+
+    def span(self, name, attrs):
+        return Span(self, name, attrs)
+
+    def record_span(self, name, start_ns, duration_ns, attrs, failed):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.add(duration_ns / 1e9)
+            if failed:
+                self.counters[name + ".errors"] += 1
+            if self.format != "chrome":
+                return
+            if len(self.events) >= self.MAX_EVENTS:
+                self.dropped += 1
+                return
+            thread = threading.current_thread()
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append({
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": start_ns / 1000,
+                "dur": duration_ns / 1000,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": redact(attrs),
+            })
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def observe(self, name, value):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.add(value)
+
+    def drain(self):
+        """取出並清空目前的紀錄 (子行程交回主行程用)"""
+        with self._lock:
+            threads = {(os.getpid(), tid): name for tid, name in self.threads.items()}
+            threads.update(self.child_threads)
+            state = (dict(self.counters), self.histograms, self.events, self.dropped, threads)
+        self.reset()
+        return state
+
+    def merge(self, state):
+        counters, histograms, events, dropped, threads = state
+        with self._lock:
+            self.counters.update(counters)
+            for name, hist in histograms.items():
+                mine = self.histograms.get(name)
+                if mine is None:
+                    self.histograms[name] = hist
+                else:
+                    mine.merge(hist)
+            room = max(0, self.MAX_EVENTS - len(self.events))
+            self.events.extend(events[:room])
+            self.dropped += dropped + max(0, len(events) - room)
+            self.child_threads.update(threads)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": dict(self.counters),
+                "histograms": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "dropped_events": self.dropped,
+            }
+
+    def chrome_trace(self):
+        stats = self.snapshot()
+        with self._lock:
+            events = list(self.events)
+            names = {(os.getpid(), tid): name for tid, name in self.threads.items()}
+            names.update(self.child_threads)
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for (pid, tid), name in names.items()
+        ]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms", "otherData": stats}
+
+    def export(self, path=None, fmt=None):
+        path = path or self.path
+        fmt = fmt or self.format
+        data = self.chrome_trace() if fmt == "chrome" else self.snapshot()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+
+_tracer = None
+_atexit_registered = False
+
+
+def configure(path, fmt=None):
+    """啟用追蹤；path 為 None 時停用。程式結束時 (只在主行程) 輸出到 path"""
+    global _tracer, _atexit_registered
+    if path is None:
+        _tracer = None
+        return None
+    _tracer = Tracer(path, (fmt or "json").lower())
+    if not _atexit_registered:
+        atexit.register(_export_at_exit)
+        _atexit_registered = True
+    return _tracer
+
+
+def _export_at_exit():
+    if _tracer is None or multiprocessing.parent_process() is not None:
+        return
+    try:
+        _tracer.export()
+    except OSError as e:
+        print(f"Warning: 無法輸出追蹤紀錄 ({e})", file=sys.stderr)
+
+
+def get_tracer():
+    return _tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **attrs):
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, attrs)
+
+
+def count(name, n=1):
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, n)
+
+
+def observe(name, value):
+    tracer = _tracer
+    if tracer is not None:
+        tracer.observe(name, value)
+
+
+def drain():
+    """子行程：取出紀錄交回主行程；未啟用時回傳 None"""
+    tracer = _tracer
+    return tracer.drain() if tracer is not None else None
+
+
+def merge(state):
+    tracer = _tracer
+    if tracer is not None and state is not None:
+        tracer.merge(state)
+
+
+def reset():
+    """清空紀錄 (fork 出的子行程會繼承主行程已有的紀錄)"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.reset()
+
+
+if os.environ.get("AUTORENAMER_TRACE"):
+    try:
+        configure(os.environ["AUTORENAMER_TRACE"], os.environ.get("AUTORENAMER_TRACE_FORMAT"))
+    except ValueError as e:
+        print(f"Warning: 追蹤未啟用 ({e})", file=sys.stderr)
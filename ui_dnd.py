@@ -1,5 +1,6 @@
 import customtkinter as ctk
 from tkinterdnd2 import DND_FILES
+from file_walker import WalkOptions
 
 class DragDropWindow(ctk.CTkFrame):
     def __init__(self, master, on_files_dropped_callback):
@@ -10,7 +11,7 @@ class DragDropWindow(ctk.CTkFrame):
         self.grid_rowconfigure(0, weight=1)
 
         self.label_frame = ctk.CTkFrame(self, border_width=2, border_color="gray")
-        self.label_frame.grid(row=0, column=0, padx=50, pady=50, sticky="nsew")
+        self.label_frame.grid(row=0, column=0, padx=50, pady=(50, 10), sticky="nsew")
 
         self.lbl_instruction = ctk.CTkLabel(
             self.label_frame, 
@@ -19,23 +20,55 @@ class DragDropWindow(ctk.CTkFrame):
         )
         self.lbl_instruction.place(relx=0.5, rely=0.5, anchor="center")
 
+        # 資料夾展開選項
+        options_frame = ctk.CTkFrame(self, fg_color="transparent")
+        options_frame.grid(row=1, column=0, padx=50, pady=(0, 30), sticky="ew")
+
+        self.chk_recursive = ctk.CTkCheckBox(options_frame, text="加入資料夾內的檔案", command=self.update_options_state)
+        self.chk_recursive.pack(side="left", padx=5)
+
+        self.entry_ext = ctk.CTkEntry(options_frame, width=160, placeholder_text="副檔名 (例: jpg, png)")
+        self.entry_ext.pack(side="left", padx=5)
+
+        self.entry_exclude = ctk.CTkEntry(options_frame, width=160, placeholder_text="排除 (例: .git, *.tmp)")
+        self.entry_exclude.pack(side="left", padx=5)
+
+        self.entry_depth = ctk.CTkEntry(options_frame, width=80, placeholder_text="最大層數")
+        self.entry_depth.pack(side="left", padx=5)
+
+        self.update_options_state()
+
         self.drop_target_register(DND_FILES)
         self.dnd_bind('<<Drop>>', self.handle_drop)
 
+    def update_options_state(self):
+        state = "normal" if self.chk_recursive.get() else "disabled"
+        for entry in (self.entry_ext, self.entry_exclude, self.entry_depth):
+            entry.configure(state=state)
+
+    @staticmethod
+    def _split_list(text):
+        return [item for item in text.replace(",", " ").split() if item]
+
+    def get_walk_options(self):
+        """未勾選「加入資料夾內的檔案」時回傳 None (資料夾本身會被當成一個項目加入)"""
+        if not self.chk_recursive.get():
+            return None
+        try:
+            max_depth = int(self.entry_depth.get())
+        except ValueError:
+            max_depth = None
+        return WalkOptions(
+            exclude=self._split_list(self.entry_exclude.get()),
+            extensions=self._split_list(self.entry_ext.get()) or None,
+            max_depth=max_depth
+        )
+
     def handle_drop(self, event):
         if event.data:
             files = self.parse_dnd_files(event.data)
-            self.on_files_dropped(files)
+            self.on_files_dropped(files, self.get_walk_options())
 
     def parse_dnd_files(self, data_str):
-        files = []
-        buf = ""
-        in_curly = False
-        for char in data_str:
-            if char == '{': in_curly = True
-            elif char == '}': in_curly = False
-            elif char == ' ' and not in_curly:
-                if buf: files.append(buf); buf = ""
-            else: buf += char
-        if buf: files.append(buf)
-        return files
\ No newline at end of file
+        # 拖放資料為 Tcl list 格式 (含空白的路徑以 {} 包住)，交給 Tcl 解析
+        return list(self.tk.splitlist(data_str))
\ No newline at end of file
@@ -0,0 +1,241 @@
+import customtkinter as ctk
+
+ROW_HEIGHT = 35
+ROW_PAD = 1
+WHEEL_STEP = 3
+
+
+def configure_columns(frame):
+    frame.grid_columnconfigure(0, weight=0) # 選取
+    frame.grid_columnconfigure(1, weight=0) # Icon
+    frame.grid_columnconfigure(2, weight=4) # 原檔名
+    frame.grid_columnconfigure(3, weight=0) # 箭頭
+    frame.grid_columnconfigure(4, weight=4) # 新檔名
+    frame.grid_columnconfigure(5, weight=0) # AI 按鈕
+    frame.grid_columnconfigure(6, weight=0) # 刪除按鈕
+
+
+class _PreviewRow:
+    """一列可重複使用的元件；只在顯示內容改變時才呼叫 configure"""
+    def __init__(self, owner):
+        self.owner = owner
+        self.item = None
+        self.rendered = None
+
+        self.frame = ctk.CTkFrame(owner.body, fg_color="transparent", height=ROW_HEIGHT)
+        self.frame.grid_propagate(False)
+        configure_columns(self.frame)
+        self.frame.grid_rowconfigure(0, weight=1)
+
+        self.chk_select = ctk.CTkCheckBox(self.frame, text="", width=24, command=self.on_select)
+        self.chk_select.grid(row=0, column=0, padx=(5, 0))
+
+        self.lbl_icon = ctk.CTkLabel(self.frame, text="", width=30)
+        self.lbl_icon.grid(row=0, column=1, padx=5)
+
+        self.lbl_old = ctk.CTkLabel(self.frame, text="", anchor="w")
+        self.lbl_old.grid(row=0, column=2, sticky="ew", padx=5)
+
+        ctk.CTkLabel(self.frame, text="➜", text_color="gray").grid(row=0, column=3)
+
+        self.lbl_new = ctk.CTkLabel(self.frame, text="", anchor="w")
+        self.lbl_new.grid(row=0, column=4, sticky="ew", padx=5)
+
+        self.btn_ai = ctk.CTkButton(
+            self.frame,
+            text="✨",
+            width=30,
+            height=24,
+            fg_color="#8E44AD",
+            hover_color="#9B59B6",
+            command=self.on_ai
+        )
+        self.btn_ai.grid(row=0, column=5, padx=2, pady=2)
+
+        btn_del = ctk.CTkButton(
+            self.frame,
+            text="X",
+            width=30,
+            height=24,
+            fg_color="#C0392B",
+            hover_color="#E74C3C",
+            command=self.on_remove
+        )
+        btn_del.grid(row=0, column=6, padx=5, pady=2)
+
+        owner.bind_wheel(self.frame)
+
+    def on_ai(self):
+        if self.item:
+            self.owner.on_ai(self.item.id, self.item.full_old)
+
+    def on_remove(self):
+        if self.item:
+            self.owner.selected.discard(self.item.id)
+            self.owner.on_remove(self.item.id)
+
+    def on_select(self):
+        if self.item:
+            if self.chk_select.get():
+                self.owner.selected.add(self.item.id)
+            else:
+                self.owner.selected.discard(self.item.id)
+
+    def show(self, index, item):
+        self.item = item
+        is_selected = item.id in self.owner.selected
+        if (self.rendered is not None and self.rendered[0] is item
+                and self.rendered[1] == index % 2 and self.rendered[2][-1] == is_selected):
+            return
+
+        row_color = "transparent" if index % 2 == 0 else ("#2b2b2b" if ctk.get_appearance_mode()=="Dark" else "#e0e0e0")
+
+        new_text = item.new
+        status_text = ""
+        label_text_color = None
+        if item.is_overridden:
+            label_text_color = "#3498DB"
+        elif item.status != 'ok':
+            status_text = f" [{item.status}]"
+            if item.status == 'conflict': label_text_color = "orange"
+            if item.status == 'duplicate': label_text_color = "red"
+
+        state = (row_color, item.is_dir, item.original, new_text + status_text, label_text_color, is_selected)
+        prev = self.rendered[2] if self.rendered else None
+        self.rendered = (item, index % 2, state)
+        if state == prev:
+            return
+
+        if prev is None or prev[0] != row_color:
+            self.frame.configure(fg_color=row_color)
+
+        if prev is None or prev[1] != item.is_dir:
+            icon_img = self.owner.img_folder if item.is_dir else self.owner.img_file
+            if icon_img:
+                self.lbl_icon.configure(image=icon_img, text="")
+            else:
+                self.lbl_icon.configure(text="[F]" if item.is_dir else "[D]")
+            if item.is_dir:
+                self.btn_ai.grid_remove()
+            else:
+                self.btn_ai.grid()
+
+        if prev is None or prev[2] != item.original:
+            self.lbl_old.configure(text=item.original)
+
+        if prev is None or prev[3:5] != state[3:5]:
+            self.lbl_new.configure(
+                text=state[3],
+                text_color=label_text_color if label_text_color else ctk.ThemeManager.theme["CTkLabel"]["text_color"]
+            )
+
+        if prev is None or prev[5] != is_selected:
+            if is_selected:
+                self.chk_select.select()
+            else:
+                self.chk_select.deselect()
+
+    def hide(self):
+        self.item = None
+        self.frame.pack_forget()
+
+
+class PreviewList(ctk.CTkFrame):
+    """
+    虛擬化的預覽列表：只建立可視範圍內的列元件，捲動時重複使用，
+    因此更新成本只與視窗高度有關，與檔案數量無關。
+    """
+    def __init__(self, master, on_ai, on_remove, img_file=None, img_folder=None):
+        super().__init__(master)
+        self.on_ai = on_ai
+        self.on_remove = on_remove
+        self.img_file = img_file
+        self.img_folder = img_folder
+
+        self.items = []
+        self.selected = set()
+        self.offset = 0
+        self.pool = []
+        self.visible_rows = 0
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        # 列數由可用高度決定，不讓子元件反過來撐大列表
+        self.body.pack_propagate(False)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.body.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.body)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self.on_wheel)
+        widget.bind("<Button-4>", self.on_wheel)
+        widget.bind("<Button-5>", self.on_wheel)
+
+    def set_items(self, items):
+        self.items = items
+        self.scroll_to(self.offset)
+
+    def select_all(self, flag):
+        if flag:
+            self.selected = {item.id for item in self.items}
+        else:
+            self.selected = set()
+        self.render()
+
+    def selected_items(self):
+        """回傳目前列表中被勾選的項目 (依列表順序)"""
+        selected = self.selected
+        return [item for item in self.items if item.id in selected]
+
+    def on_resize(self, event):
+        rows = max(1, event.height // (ROW_HEIGHT + 2 * ROW_PAD))
+        if rows == self.visible_rows:
+            return
+        self.visible_rows = rows
+        while len(self.pool) < rows:
+            self.pool.append(_PreviewRow(self))
+        self.scroll_to(self.offset)
+
+    def on_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.offset - WHEEL_STEP)
+        else:
+            self.scroll_to(self.offset + WHEEL_STEP)
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.items)))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(value) * step)
+
+    def scroll_to(self, offset):
+        max_offset = max(0, len(self.items) - self.visible_rows)
+        self.offset = max(0, min(offset, max_offset))
+        self.render()
+
+    def render(self):
+        total = len(self.items)
+        for slot in range(self.visible_rows):
+            row = self.pool[slot]
+            index = self.offset + slot
+            if index < total:
+                if row.item is None:
+                    row.frame.pack(fill="x", pady=ROW_PAD)
+                row.show(index, self.items[index])
+            elif row.item is not None:
+                row.hide()
+        for row in self.pool[self.visible_rows:]:
+            if row.item is not None:
+                row.hide()
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -7,6 +7,8 @@ import sys
 
 from ai_service import AIService 
 from ui_config import APIConfigDialog
+from ui_preview_list import PreviewList, configure_columns
+from preview_worker import PreviewWorker
 
 def resource_path(relative_path):
     try:
@@ -16,6 +18,27 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+def ask_recover(manager):
+    """
+    詢問如何處理中斷的重命名批次 (當機、斷電)。
+    回傳: None 表示稍後再處理，否則為 recover 是否成功
+    """
+    state = manager.interrupted
+    state.resolve()
+    answer = messagebox.askyesnocancel(
+        "偵測到未完成的重命名",
+        f"上次的批次在完成 {state.applied_count}/{state.total} 個步驟後中斷。\n\n"
+        "是：繼續完成剩下的重命名\n否：將已改名的檔案改回原名\n取消：稍後再處理 (處理前無法重命名，可在編輯畫面按「處理中斷的批次」)"
+    )
+    if answer is None:
+        return None
+    success, msg = manager.recover(resume=answer)
+    if success:
+        messagebox.showinfo("完成", msg)
+    else:
+        messagebox.showerror("錯誤", msg)
+    return success
+
 class RenamerWindow(ctk.CTkFrame):
     def __init__(self, master, manager, on_back_callback):
         super().__init__(master)
@@ -38,13 +61,26 @@ class RenamerWindow(ctk.CTkFrame):
             self.img_file = None
             self.img_folder = None
 
+        self.current_previews = []
+        self.last_query = None
+        self.ai_cancel = None
+        self.ingest_count = None # 背景讀取資料夾時為目前已加入的數量
+        self.files_changed = threading.Event() # 監看執行緒設定，由 poll_files_changed 在 UI 執行緒處理
+        self.poll_job = None
         self.setup_ui()
+        self.preview_worker = PreviewWorker(self.manager, self.on_preview_ready)
         
-        _, removed = self.manager.validate_files()
+        # 可監看時外部變動會直接反映到列表；開始監看時已重新掃描資料夾，不必再強制掃描
+        watching = self.manager.start_watching(on_change=self.on_files_changed)
+        if watching:
+            self.poll_files_changed()
+        _, removed = self.manager.validate_files(refresh=not watching)
         if removed > 0:
             messagebox.showinfo("檔案變更", f"有 {removed} 個檔案已不存在，已從列表中移除。")
 
         self.update_preview() 
+        # 上次工作階段保存的復原紀錄、尚未處理的中斷批次
+        self.update_buttons_state()
         
         self.entry_pattern.focus_set()
 
@@ -78,25 +114,25 @@ class RenamerWindow(ctk.CTkFrame):
         header_frame = ctk.CTkFrame(self, fg_color="transparent", height=30)
         header_frame.pack(fill="x", padx=10)
         
-        header_frame.grid_columnconfigure(0, weight=0) # Icon
-        header_frame.grid_columnconfigure(1, weight=4) # 原檔名
-        header_frame.grid_columnconfigure(2, weight=0) # 箭頭
-        header_frame.grid_columnconfigure(3, weight=4) # 新檔名
-        header_frame.grid_columnconfigure(4, weight=0) # AI 按鈕
-        header_frame.grid_columnconfigure(5, weight=0) # 刪除按鈕
-
-        ctk.CTkLabel(header_frame, text="", width=30).grid(row=0, column=0)
-        ctk.CTkLabel(header_frame, text="原檔名", anchor="w", font=("Arial", 12, "bold")).grid(row=0, column=1, sticky="ew", padx=5)
-        ctk.CTkLabel(header_frame, text="➜").grid(row=0, column=2)
-        ctk.CTkLabel(header_frame, text="新檔名", anchor="w", font=("Arial", 12, "bold")).grid(row=0, column=3, sticky="ew", padx=5)
-        ctk.CTkLabel(header_frame, text="AI", width=30, font=("Arial", 12, "bold")).grid(row=0, column=4, padx=5)
-        ctk.CTkLabel(header_frame, text="刪除", width=40, font=("Arial", 12, "bold")).grid(row=0, column=5, padx=5)
-
-        self.scroll_frame = ctk.CTkScrollableFrame(self, label_text="")
-        self.scroll_frame.pack(fill="both", expand=True, padx=10, pady=5)
-        
-        self.preview_items_frame = ctk.CTkFrame(self.scroll_frame, fg_color="transparent")
-        self.preview_items_frame.pack(fill="both", expand=True)
+        configure_columns(header_frame)
+
+        self.chk_select_all = ctk.CTkCheckBox(header_frame, text="", width=24, command=self.toggle_select_all)
+        self.chk_select_all.grid(row=0, column=0, padx=(5, 0))
+        ctk.CTkLabel(header_frame, text="", width=30).grid(row=0, column=1)
+        ctk.CTkLabel(header_frame, text="原檔名", anchor="w", font=("Arial", 12, "bold")).grid(row=0, column=2, sticky="ew", padx=5)
+        ctk.CTkLabel(header_frame, text="➜").grid(row=0, column=3)
+        ctk.CTkLabel(header_frame, text="新檔名", anchor="w", font=("Arial", 12, "bold")).grid(row=0, column=4, sticky="ew", padx=5)
+        ctk.CTkLabel(header_frame, text="AI", width=30, font=("Arial", 12, "bold")).grid(row=0, column=5, padx=5)
+        ctk.CTkLabel(header_frame, text="刪除", width=40, font=("Arial", 12, "bold")).grid(row=0, column=6, padx=5)
+
+        self.preview_list = PreviewList(
+            self,
+            on_ai=self.run_ai_analysis,
+            on_remove=self.remove_item,
+            img_file=self.img_file,
+            img_folder=self.img_folder
+        )
+        self.preview_list.pack(fill="both", expand=True, padx=10, pady=5)
 
         btn_frame = ctk.CTkFrame(self)
         btn_frame.pack(fill="x", padx=10, pady=10)
@@ -110,17 +146,57 @@ class RenamerWindow(ctk.CTkFrame):
         self.btn_redo = ctk.CTkButton(btn_frame, text="⟳ Redo", command=self.do_redo, state="disabled", fg_color="gray")
         self.btn_redo.pack(side="left", padx=5)
 
+        # 只在有中斷的批次時顯示 (update_buttons_state)
+        self.btn_recover = ctk.CTkButton(btn_frame, text="⚠ 處理中斷的批次", command=self.do_recover, fg_color="#D35400", hover_color="#E67E22")
+
+        self.btn_ai_batch = ctk.CTkButton(btn_frame, text="✨ AI 批次命名", command=self.run_ai_batch, fg_color="#8E44AD", hover_color="#9B59B6")
+        self.btn_ai_batch.pack(side="left", padx=5)
+
+        self.lbl_ai_progress = ctk.CTkLabel(btn_frame, text="", text_color="gray")
+        self.lbl_ai_progress.pack(side="left", padx=5)
+
         self.btn_confirm = ctk.CTkButton(btn_frame, text="確認並批量重命名", command=self.do_rename, fg_color="green")
         self.btn_confirm.pack(side="right", padx=5)
 
-    def update_preview(self, event=None):
+    def destroy(self):
+        # 不在 UI 執行緒等待監看執行緒結束
+        self.manager.stop_watching(wait=False)
+        if self.poll_job is not None:
+            self.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.preview_worker.stop()
+        super().destroy()
+
+    def on_files_changed(self):
+        # 由監看執行緒呼叫：不可直接操作 Tk (after 會等待 UI 執行緒，而 UI 執行緒可能正等著 manager.lock)
+        self.files_changed.set()
+
+    def poll_files_changed(self):
+        """每 200ms 檢查監看執行緒是否回報過變動"""
+        if self.files_changed.is_set():
+            self.files_changed.clear()
+            self.update_preview(debounce=True)
+        self.poll_job = self.after(200, self.poll_files_changed)
+
+    def update_preview(self, event=None, debounce=False):
+        """排程背景預覽；按鍵事件 (或 debounce=True) 會去抖動，其餘立即重算"""
         pattern = self.entry_pattern.get()
         repl = self.entry_repl.get()
 
-        for widget in self.preview_items_frame.winfo_children():
-            widget.destroy()
+        if event is not None and (pattern, repl) == self.last_query:
+            return
+        self.last_query = (pattern, repl)
+        self.preview_worker.request(pattern, repl, delay=None if event is not None or debounce else 0)
+
+    def on_preview_ready(self, generation, result):
+        self.after(0, lambda: self.show_preview(generation, result))
 
-        self.current_previews, error, has_conflict = self.manager.get_preview(pattern, repl)
+    def show_preview(self, generation, result):
+        # 結果送達前若已有更新的請求，直接丟棄
+        if not self.preview_worker.is_current(generation):
+            return
+
+        self.current_previews, error, has_conflict = result
 
         if error:
             self.lbl_status.configure(text=error, text_color="red")
@@ -132,121 +208,127 @@ class RenamerWindow(ctk.CTkFrame):
             self.lbl_status.configure(text=f"列表共 {len(self.current_previews)} 個項目", text_color="green")
             self.btn_confirm.configure(state="normal", fg_color="green")
 
-        self.preview_items_frame.grid_columnconfigure(0, weight=0)
-        self.preview_items_frame.grid_columnconfigure(1, weight=4)
-        self.preview_items_frame.grid_columnconfigure(2, weight=0)
-        self.preview_items_frame.grid_columnconfigure(3, weight=4)
-        self.preview_items_frame.grid_columnconfigure(4, weight=0)
-        self.preview_items_frame.grid_columnconfigure(5, weight=0)
-
-        for i, item in enumerate(self.current_previews):
-            row_color = "transparent" if i % 2 == 0 else ("#2b2b2b" if ctk.get_appearance_mode()=="Dark" else "#e0e0e0")
-            
-            row_frame = ctk.CTkFrame(self.preview_items_frame, fg_color=row_color, height=35)
-            row_frame.pack(fill="x", pady=1)
-            
-            row_frame.grid_columnconfigure(0, weight=0)
-            row_frame.grid_columnconfigure(1, weight=4)
-            row_frame.grid_columnconfigure(2, weight=0)
-            row_frame.grid_columnconfigure(3, weight=4)
-            row_frame.grid_columnconfigure(4, weight=0)
-            row_frame.grid_columnconfigure(5, weight=0)
-
-            icon_img = self.img_folder if item['is_dir'] else self.img_file
-            if icon_img:
-                ctk.CTkLabel(row_frame, text="", image=icon_img, width=30).grid(row=0, column=0, padx=5)
-            else:
-                ctk.CTkLabel(row_frame, text="[F]" if item['is_dir'] else "[D]", width=30).grid(row=0, column=0, padx=5)
-
-            ctk.CTkLabel(row_frame, text=item['original'], anchor="w").grid(row=0, column=1, sticky="ew", padx=5)
-            
-            ctk.CTkLabel(row_frame, text="➜", text_color="gray").grid(row=0, column=2)
-
-            new_text = item['new']
-            status_text = ""
-            label_text_color = "text_color"
-            
-            if item.get('is_overridden'):
-                # status_text = " [AI]"
-                status_text = ""
-                label_text_color = "#3498DB"
-            elif item['status'] != 'ok':
-                status_text = f" [{item['status']}]"
-                if item['status'] == 'conflict': label_text_color = "orange"
-                if item['status'] == 'duplicate': label_text_color = "red"
-                
-            ctk.CTkLabel(
-                row_frame, 
-                text=new_text + status_text, 
-                anchor="w", 
-                text_color=label_text_color if label_text_color != "text_color" else None
-            ).grid(row=0, column=3, sticky="ew", padx=5)
-            
-            if not item['is_dir']:
-                btn_ai = ctk.CTkButton(
-                    row_frame, 
-                    text="✨", 
-                    width=30, 
-                    height=24, 
-                    fg_color="#8E44AD", 
-                    hover_color="#9B59B6",
-                    command=lambda p=item['full_old'], uid=item['id']: self.run_ai_analysis(uid, p)
-                )
-                btn_ai.grid(row=0, column=4, padx=2, pady=2)
-            
-            btn_del = ctk.CTkButton(
-                row_frame, 
-                text="X", 
-                width=30, 
-                height=24, 
-                fg_color="#C0392B", 
-                hover_color="#E74C3C",
-                command=lambda uid=item['id']: self.remove_item(uid)
-            )
-            btn_del.grid(row=0, column=5, padx=5, pady=2)
+        if self.ingest_count is not None:
+            # 讀取尚未完成前不允許重命名，避免只處理到部分檔案
+            self.lbl_status.configure(text=f"讀取資料夾中... 已加入 {self.ingest_count} 個檔案", text_color="blue")
+            self.btn_confirm.configure(state="disabled", fg_color="gray")
+
+        self.preview_list.set_items(self.current_previews)
+
+    def on_ingest_progress(self, count, done):
+        """背景讀取資料夾的進度 (主執行緒)；預覽仍在計算時不重複排程，讓大量檔案也能持續顯示"""
+        self.ingest_count = None if done else count
+        if done:
+            self.update_preview()
+        elif not self.preview_worker.busy:
+            self.update_preview(debounce=True)
+
+    def toggle_select_all(self):
+        self.preview_list.select_all(bool(self.chk_select_all.get()))
+
+    def run_ai_analysis(self, uid, file_path):
+        self.start_ai_batch([(uid, file_path)])
+
+    def run_ai_batch(self):
+        """對勾選的項目 (未勾選時為全部檔案) 執行 AI 命名；執行中再按一次則停止"""
+        if self.ai_cancel is not None:
+            self.ai_cancel.set()
+            self.btn_ai_batch.configure(state="disabled")
+            return
+
+        items = self.preview_list.selected_items() or self.current_previews
+        jobs = [(item.id, item.full_old) for item in items if not item.is_dir]
+        if not jobs:
+            messagebox.showinfo("AI 批次命名", "沒有可分析的檔案")
+            return
+        self.start_ai_batch(jobs)
+
+    def start_ai_batch(self, jobs):
+        if self.ai_cancel is not None:
+            messagebox.showinfo("AI 分析", "AI 批次命名進行中，請稍候或先停止。")
+            return
 
-    def run_ai_analysis(self, uid, file_path):        
         if not AIService.is_configured():
-            APIConfigDialog(self, lambda ep, key: self.on_api_configured(ep, key, uid, file_path))
+            APIConfigDialog(self, lambda ep, key: self.on_api_configured(ep, key, jobs))
             return
 
-        self.execute_ai_thread(uid, file_path)
+        self.execute_ai_batch(jobs)
 
-    def on_api_configured(self, endpoint, key, uid, file_path):
+    def on_api_configured(self, endpoint, key, jobs):
         AIService.configure(key, endpoint)
-        self.execute_ai_thread(uid, file_path)
+        self.execute_ai_batch(jobs)
 
-    def execute_ai_thread(self, uid, file_path):
-        def task():
-            self.lbl_status.configure(text="AI 分析中 (上傳與運算)...", text_color="blue")
-            
-            new_name, msg = AIService.analyze_and_rename(file_path)
-            
+    def execute_ai_batch(self, jobs):
+        total = len(jobs)
+        self.ai_cancel = cancel = threading.Event()
+        self.ai_progress = {'done': 0, 'failed': 0, 'total': total}
+        self.btn_ai_batch.configure(text="■ 停止 AI 批次", fg_color="#C0392B", hover_color="#E74C3C")
+        self.lbl_ai_progress.configure(text=f"AI 分析中 0/{total}", text_color="blue")
+
+        def on_result(uid, new_name, msg):
             self.after(0, lambda: self.handle_ai_result(uid, new_name, msg))
 
+        def task():
+            succeeded, failures = AIService.analyze_batch(jobs, on_result, cancel.is_set)
+            self.after(0, lambda: self.finish_ai_batch(succeeded, failures))
+
         threading.Thread(target=task, daemon=True).start()
 
     def handle_ai_result(self, uid, new_name, msg):
+        progress = self.ai_progress
+        progress['done'] += 1
         if new_name:
+            self.preview_worker.cancel()
             self.manager.set_file_override(uid, new_name)
-            self.lbl_status.configure(text=msg, text_color="green")
-            self.update_preview()
+            # 批次結果陸續送達，合併成一次預覽更新
+            self.update_preview(debounce=True)
         else:
-            messagebox.showerror("AI 分析失敗", msg)
-            self.lbl_status.configure(text=f"AI 錯誤: {msg}", text_color="red")
+            progress['failed'] += 1
+
+        text = f"AI 分析中 {progress['done']}/{progress['total']}"
+        if progress['failed']:
+            text += f"，失敗 {progress['failed']}"
+        self.lbl_ai_progress.configure(text=text)
+
+    def finish_ai_batch(self, succeeded, failures):
+        total = self.ai_progress['total']
+        self.ai_cancel = None
+        self.btn_ai_batch.configure(text="✨ AI 批次命名", state="normal", fg_color="#8E44AD", hover_color="#9B59B6")
+
+        if not failures:
+            self.lbl_ai_progress.configure(text=f"AI 完成 {succeeded}/{total}", text_color="green")
+            return
+
+        self.lbl_ai_progress.configure(text=f"AI 完成 {succeeded}/{total}，失敗 {len(failures)}", text_color="red")
+        if total == 1:
+            messagebox.showerror("AI 分析失敗", failures[0][2])
+            return
+
+        lines = [f"{os.path.basename(path)}: {msg}" for _, path, msg in failures[:10]]
+        if len(failures) > 10:
+            lines.append(f"... 以及其他 {len(failures) - 10} 個檔案")
+        messagebox.showwarning("AI 批次命名", f"{len(failures)} 個檔案分析失敗：\n" + "\n".join(lines))
 
     def remove_item(self, uid):
+        self.preview_worker.cancel()
         self.manager.remove_file_by_id(uid)
         self.update_buttons_state()
         self.update_preview()
 
     def do_rename(self):
-        _, _, has_conflict = self.manager.get_preview(self.entry_pattern.get(), self.entry_repl.get())
+        # 以輸入框當下的內容同步重算一次，避免使用尚未更新的背景預覽
+        self.preview_worker.cancel()
+        previews, error, has_conflict = self.manager.get_preview(self.entry_pattern.get(), self.entry_repl.get())
+        if error:
+            messagebox.showerror("錯誤", error)
+            self.update_preview()
+            return
         if has_conflict:
             if not messagebox.askyesno("衝突警告", "檢測到檔名衝突。\n確定要繼續嗎？"):
+                self.update_preview()
                 return
 
-        success, msg = self.manager.execute_rename(self.current_previews)
+        success, msg = self.manager.execute_rename(previews)
         if success:
             self.lbl_status.configure(text=msg, text_color="green")
             self.entry_pattern.delete(0, 'end')
@@ -257,13 +339,24 @@ class RenamerWindow(ctk.CTkFrame):
             messagebox.showerror("錯誤", msg)
 
     def do_undo(self):
+        self.preview_worker.cancel()
         success, msg = self.manager.undo()
         self.handle_history_op(success, msg)
 
     def do_redo(self):
+        self.preview_worker.cancel()
         success, msg = self.manager.redo()
         self.handle_history_op(success, msg)
 
+    def do_recover(self):
+        if self.manager.interrupted is None:
+            self.update_buttons_state()
+            return
+        self.preview_worker.cancel()
+        if ask_recover(self.manager) is not None:
+            self.update_buttons_state()
+        self.update_preview()
+
     def handle_history_op(self, success, msg):
         if success:
             self.lbl_status.configure(text=msg, text_color="blue")
@@ -274,7 +367,11 @@ class RenamerWindow(ctk.CTkFrame):
             self.update_preview() # 刷新列表以移除可能已遺失的檔案
 
     def update_buttons_state(self):
-        """更新 Undo/Redo 按鈕的可用狀態"""
+        """更新 Undo/Redo 按鈕的可用狀態，有中斷的批次時顯示處理按鈕"""
+        if self.manager.interrupted is not None:
+            self.btn_recover.pack(side="left", padx=5, after=self.btn_redo)
+        else:
+            self.btn_recover.pack_forget()
         self.btn_undo.configure(
             state="normal" if self.manager.history else "disabled", 
             fg_color="#3B8ED0" if self.manager.history else "gray"